@@ -0,0 +1,197 @@
+"""
+Parser benchmark over a corpus of listing pages, runs offline.
+
+Measures the parse stage (GetaProScraper.parse_listing) per parser
+backend: cards per second, milliseconds per page and peak memory.
+Results are printed as JSON; with --baseline the run fails (exit code 1)
+when a backend got slower or hungrier than the threshold allows.
+
+    python bench_parser.py --record             # save live pages to fixtures/
+    python bench_parser.py --save-baseline bench_baseline.json
+    python bench_parser.py --baseline bench_baseline.json --threshold 0.2
+
+Without recorded pages in fixtures/ a synthetic corpus with the same
+markup as getapro.lv listings is generated (reported as "synthetic").
+"""
+
+import argparse
+import base64
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from scraper import GetaProScraper, LISTING_PARSERS, create_listing_parser
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Cards per synthetic page: empty, single, typical listing sizes and a large one
+SYNTHETIC_SIZES = [0, 1, 10, 20, 50, 200]
+
+
+def synthetic_card(job_id: int, rng: random.Random) -> str:
+    """One job card with the structure of a getapro.lv listing card"""
+    href = base64.b64encode(f"/job/details/{job_id}".encode()).decode()
+    words = ["flīzēšana", "remonts", "vannas", "istaba", "steidzami", "krāsošana", "logu", "montāža"]
+    description = " ".join(rng.choice(words) for _ in range(rng.randint(5, 60)))
+    price = rng.choice(["Nav norādīts", "100 €", "50-80 €", "1 200 €", "Līgumcena"])
+    return f'''<div class="job-list-item col-12" data-id="{job_id}" data-name="Darbs {job_id} &amp; co" data-brand="Rīga" data-price="{rng.randint(0, 2000)}" data-variant="2025-01-{job_id % 28 + 1:02d}" data-href="{href}">
+  <div class="job-list__header"><a href="/job/details/{job_id}">Darbs {job_id}</a></div>
+  <div class="job-list__content"><p>{description} <b>{job_id}</b></p><!-- teaser --></div>
+  <ul class="job-post-tags">
+    <li><i>Apakškategorija {job_id % 7}</i></li>
+    <li class="price"><i>{price}</i></li>
+    <li class="time"><i>Pirms {job_id % 60} min</i></li>
+  </ul>
+  <span class="address">Rīga, iela {job_id}</span>
+</div>'''
+
+
+def synthetic_page(card_count: int, seed: int) -> str:
+    """A listing page with head, navigation and filters before the cards"""
+    rng = random.Random(seed)
+    head = '<script src="/assets/app.js"></script>' * 20 + '<link rel="stylesheet" href="/a.css">' * 20
+    navigation = ''.join(f'<li><a href="/job/index/{i}">Kategorija {i}</a></li>' for i in range(200))
+    cards = '\n'.join(synthetic_card(100000 + seed * 1000 + i, rng) for i in range(card_count))
+    return (f'<!DOCTYPE html><html><head><title>Darbi</title>{head}</head><body>'
+            f'<nav><ul>{navigation}</ul></nav><div class="job-list">{cards}</div>'
+            f'<footer>GetaPro</footer></body></html>')
+
+
+def load_corpus() -> tuple:
+    """(corpus kind, [(name, html)]) from fixtures/, or a synthetic corpus"""
+    files = sorted(FIXTURES_DIR.glob("*.html"))
+    if files:
+        return "recorded", [(path.stem, path.read_text(encoding='utf-8')) for path in files]
+    return "synthetic", [(f"synthetic-{size}", synthetic_page(size, seed)) for seed, size in enumerate(SYNTHETIC_SIZES)]
+
+
+def record_fixtures(pages: int):
+    """Save live listing pages (all jobs and each category) to fixtures/"""
+    scraper = GetaProScraper()
+    FIXTURES_DIR.mkdir(exist_ok=True)
+
+    targets = [("all", scraper.JOBS_URL)]
+    targets += [(slug, scraper.BASE_URL + info["url"]) for slug, info in scraper.CATEGORIES.items()]
+    for name, url in targets:
+        for page in range(1, pages + 1):
+            params = {'page': page} if page > 1 else None
+            response = scraper._fetch(url, params=params, category=name)
+            response.raise_for_status()
+            path = FIXTURES_DIR / f"{name}-p{page}.html"
+            path.write_text(response.text, encoding='utf-8')
+            print(f"Saved {path.name} ({len(response.text) // 1024} KB)", file=sys.stderr)
+
+
+def bench_page(scraper: GetaProScraper, parser, html: str, min_time: float) -> dict:
+    """Time and memory of parsing one page with one backend"""
+    cards = len(scraper.parse_listing(html, "Bench", parser))
+
+    # Repeat until min_time has passed (at least 3 runs) and report the median
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < 3 or time.perf_counter() - started < min_time:
+        begin = time.perf_counter()
+        scraper.parse_listing(html, "Bench", parser)
+        timings.append(time.perf_counter() - begin)
+    seconds = statistics.median(timings)
+
+    # Separate run, tracemalloc slows parsing down
+    tracemalloc.start()
+    scraper.parse_listing(html, "Bench", parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cards': cards,
+        'bytes': len(html.encode('utf-8')),
+        'runs': len(timings),
+        'ms_per_page': round(seconds * 1000, 3),
+        'cards_per_sec': round(cards / seconds, 1) if cards else None,
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+
+def run_benchmark(parsers: list, min_time: float) -> dict:
+    kind, corpus = load_corpus()
+    scraper = GetaProScraper()
+    results = {'corpus': kind, 'pages': len(corpus), 'python': sys.version.split()[0], 'parsers': {}}
+
+    for name in parsers:
+        parser = create_listing_parser(name)
+        pages = {page_name: bench_page(scraper, parser, html, min_time) for page_name, html in corpus}
+        cards = sum(page['cards'] for page in pages.values())
+        seconds = sum(page['ms_per_page'] for page in pages.values()) / 1000
+        results['parsers'][name] = {
+            'cards_per_sec': round(cards / seconds, 1) if seconds else None,
+            'ms_per_page': round(seconds * 1000 / len(pages), 3) if pages else None,
+            'peak_memory_kb': max((page['peak_memory_kb'] for page in pages.values()), default=0),
+            'pages': pages
+        }
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of more than threshold (a fraction) against the baseline"""
+    regressions = []
+    for name, current in results['parsers'].items():
+        previous = baseline.get('parsers', {}).get(name)
+        if not previous:
+            continue
+
+        if previous['cards_per_sec'] and current['cards_per_sec']:
+            if current['cards_per_sec'] < previous['cards_per_sec'] * (1 - threshold):
+                regressions.append(
+                    f"{name}: {current['cards_per_sec']} cards/s, baseline {previous['cards_per_sec']}"
+                )
+        if current['peak_memory_kb'] > previous['peak_memory_kb'] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak {current['peak_memory_kb']} KB, baseline {previous['peak_memory_kb']} KB"
+            )
+    return regressions
+
+
+def main():
+    available = [name for name in LISTING_PARSERS if name != 'lxml' or create_listing_parser('auto').name == 'lxml']
+
+    arg_parser = argparse.ArgumentParser(description="Benchmark the listing parsers offline")
+    arg_parser.add_argument('--parser', choices=available, action='append',
+                            help="Backend to measure (repeatable, default: all installed)")
+    arg_parser.add_argument('--min-time', type=float, default=0.5, help="Seconds to time each page (default: 0.5)")
+    arg_parser.add_argument('--output', help="Also write the JSON results to this file")
+    arg_parser.add_argument('--baseline', help="Fail if results regressed against this JSON file")
+    arg_parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed regression as a fraction (default: 0.2)")
+    arg_parser.add_argument('--save-baseline', help="Write the results as the new baseline")
+    arg_parser.add_argument('--record', action='store_true', help="Record live pages into fixtures/ and exit")
+    arg_parser.add_argument('--record-pages', type=int, default=1, help="Listing pages recorded per category")
+    args = arg_parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record_pages)
+        return
+
+    results = run_benchmark(args.parser or available, args.min_time)
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    print(output)
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(output + "\n", encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        if baseline.get('corpus') != results['corpus']:
+            print(f"Baseline used a {baseline.get('corpus')} corpus, this run {results['corpus']}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Cold-start benchmark of the one-shot checker (scraper.py --once).
+
+Runs the checker as a fresh process, the way cron or a serverless
+platform does, against the local getapro.lv and Telegram stand-ins from
+loadtest.py, and reports wall time and peak memory per scenario:
+
+  - import: python -c "import scraper"
+  - idle: --once when every listed job was seen before (the usual run)
+  - new: --once with a few new jobs, notified through the Telegram stand-in
+
+Each --once scenario is also run through the long-running monitor's
+set-up (JobMonitor() + run_once + drain) as "full", for comparison.
+
+    python bench_startup.py --runs 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loadtest import serve_getapro, serve_telegram, start_stand_in
+
+HERE = Path(__file__).parent
+CATEGORY_SLUGS = ['celtniecibas-darbi', 'apdares-darbi', 'sadzives-remonts']
+
+# Points the checker at the stand-ins, then starts it like scraper.py would
+BOOTSTRAP = """
+import sys
+import scraper, telegram_api
+scraper.GetaProScraper.BASE_URL = {getapro!r}
+scraper.GetaProScraper.JOBS_URL = {getapro!r} + '/job'
+telegram_api.API_BASE = {telegram!r}
+if {full!r}:
+    monitor = scraper.JobMonitor()
+    monitor.run_once()
+    if monitor.outbox:
+        monitor.outbox.drain()
+else:
+    sys.argv = ['scraper.py', '--once']
+    scraper.main()
+"""
+
+
+def run_process(code: str, data_dir: Path, verbose: bool) -> tuple:
+    """(wall seconds, peak RSS in MB) of one fresh interpreter running code"""
+    env = dict(os.environ, DATA_DIR=str(data_dir))
+    for name in ('TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID', 'ENABLED_CATEGORIES', 'WEBHOOK_URL'):
+        env.pop(name, None)
+
+    output = None if verbose else subprocess.DEVNULL
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=HERE, env=env, stdout=output, stderr=output)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"Checker exited with status {os.waitstatus_to_exitcode(status)}")
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def write_config(data_dir: Path, slugs: list):
+    config = {
+        'telegram_bot_token': 'STARTUP',
+        'telegram_chat_id': '1',
+        'enabled_categories': slugs,
+        # Measure start-up, not the politeness delay between requests
+        'requests_per_second': 100,
+        'telegram_chat_rate': 30,
+        'digest_threshold': 2,
+    }
+    (data_dir / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+
+
+def forget_newest(data_dir: Path, count: int):
+    """Make the newest jobs unseen again, as if they were just posted"""
+    db = sqlite3.connect(str(data_dir / 'seen_jobs.db'))
+    with db:
+        ids = [row[0] for row in db.execute("SELECT id FROM seen")]
+        newest = sorted(ids, key=lambda job_id: int(job_id) if job_id.isdigit() else 0)[-count:]
+        db.executemany("DELETE FROM seen WHERE id = ?", [(job_id,) for job_id in newest])
+        db.execute("DELETE FROM meta WHERE key = 'high_water'")
+    db.close()
+
+
+def summarize(samples: list) -> dict:
+    seconds = [sample[0] for sample in samples]
+    return {
+        'runs': len(samples),
+        'median_ms': round(statistics.median(seconds) * 1000, 1),
+        'min_ms': round(min(seconds) * 1000, 1),
+        'max_ms': round(max(seconds) * 1000, 1),
+        'peak_rss_mb': round(max(sample[1] for sample in samples), 1)
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Measure the cold start of scraper.py --once")
+    arg_parser.add_argument('--runs', type=int, default=5, help="Processes started per scenario (default: 5)")
+    arg_parser.add_argument('--jobs', type=int, default=20, help="Jobs listed per category (default: 20)")
+    arg_parser.add_argument('--new', type=int, default=3, help="New jobs in the 'new' scenario (default: 3)")
+    arg_parser.add_argument('--output', help="Also write the JSON results to this file")
+    arg_parser.add_argument('--verbose', action='store_true', help="Show the checker's log output")
+    args = arg_parser.parse_args()
+
+    getapro_url, getapro = start_stand_in(serve_getapro, CATEGORY_SLUGS, 0, args.jobs, 1)
+    telegram_url, telegram = start_stand_in(serve_telegram, 1000, 1000)
+
+    # A state directory that has seen every listed job
+    seeded = Path(tempfile.mkdtemp(prefix='getapro-startup-'))
+    write_config(seeded, CATEGORY_SLUGS)
+
+    def code(full: bool) -> str:
+        return BOOTSTRAP.format(getapro=getapro_url, telegram=telegram_url, full=full)
+
+    run_process(code(False), seeded, args.verbose)
+
+    results = {'python': sys.version.split()[0], 'jobs_listed': args.jobs * len(CATEGORY_SLUGS), 'scenarios': {}}
+    try:
+        results['scenarios']['import'] = summarize([
+            run_process("import scraper", seeded, args.verbose) for _ in range(args.runs)
+        ])
+        for mode, full in (('once', False), ('full', True)):
+            for scenario in ('idle', 'new'):
+                samples = []
+                for _ in range(args.runs):
+                    data_dir = Path(tempfile.mkdtemp(prefix='getapro-startup-'))
+                    shutil.copytree(seeded, data_dir, dirs_exist_ok=True)
+                    if scenario == 'new':
+                        forget_newest(data_dir, args.new)
+                    samples.append(run_process(code(full), data_dir, args.verbose))
+                    shutil.rmtree(data_dir, ignore_errors=True)
+                results['scenarios'][f"{scenario}-{mode}"] = summarize(samples)
+    finally:
+        getapro.terminate()
+        telegram.terminate()
+        shutil.rmtree(seeded, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
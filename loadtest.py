@@ -0,0 +1,321 @@
+"""
+End-to-end load test of JobMonitor.run_continuous against local stand-ins.
+
+Starts two stand-in HTTP servers in child processes:
+  - getapro.lv: jobs arrive as a Poisson process spread over the
+    categories (a few busy, many quiet), listings are paginated
+  - Telegram: getUpdates long-polling, sendMessage with 429 throttling
+    above the configured global and per-chat rates
+
+Then runs the real monitor in this process, pointed at the stand-ins
+(GetaProScraper.BASE_URL and TelegramBot.api_url) with a throwaway
+DATA_DIR, and prints a JSON report: detection latency (job posted ->
+first notification), delivery latency to every subscriber, messages per
+second, 429s, and the monitor's CPU time and peak memory.
+
+    python loadtest.py --duration 120 --subscribers 2000 --jobs-per-minute 300
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+PAGE_SIZE = 20
+JOB_ID_RE = re.compile(r'/job/details/(\d+)')
+
+
+class GetaProStandIn(BaseHTTPRequestHandler):
+    """Serves /job and /job/index/<id>-<slug> listings (newest first, ?page=N)"""
+
+    jobs = {}      # slug -> [card html], oldest first
+    created = {}   # job ID -> time posted
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/_stats':
+            with self.lock:
+                return self._reply(json.dumps({'created': self.created}), 'application/json')
+
+        page = int(parse_qs(url.query).get('page', ['1'])[0])
+        with self.lock:
+            if url.path.startswith('/job/index/'):
+                cards = self.jobs.get(url.path.rsplit('/', 1)[1].split('-', 1)[1], [])
+            else:
+                cards = [card for category in self.jobs.values() for card in category]
+            newest = cards[::-1][(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+        body = ('<!DOCTYPE html><html><head><title>Darbi</title></head><body>'
+                '<div class="job-list">' + '\n'.join(newest) + '</div></body></html>')
+        self._reply(body, 'text/html; charset=utf-8')
+
+    def _reply(self, body: str, content_type: str):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TelegramStandIn(BaseHTTPRequestHandler):
+    """Bot API stand-in: getUpdates, sendMessage (with 429s), anything else succeeds"""
+
+    global_rate = 30.0
+    chat_rate = 1.0
+    sent = []        # [chat ID, time, [job IDs]]
+    throttled = 0
+    _last_global = []
+    _last_chat = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        url = urlparse(self.path)
+        method = url.path.rsplit('/', 1)[-1]
+        length = int(self.headers.get('Content-Length') or 0)
+        params = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        params.update({key: values[0] for key, values in parse_qs(url.query).items()})
+
+        if method == '_stats':
+            with self.lock:
+                return self._reply({'sent': self.sent, 'throttled': self.throttled})
+        if method == 'getUpdates':
+            # Nobody is chatting with the bot, hold the long poll open
+            time.sleep(min(float(params.get('timeout', 0)), 5))
+            return self._reply({'ok': True, 'result': []})
+        if method == 'sendMessage':
+            return self._send_message(params)
+        self._reply({'ok': True, 'result': True})
+
+    def _send_message(self, params: dict):
+        chat_id = str(params.get('chat_id'))
+        now = time.time()
+        with self.lock:
+            recent = [sent for sent in self._last_global if now - sent < 1]
+            TelegramStandIn._last_global = recent
+            if len(recent) >= self.global_rate or now - self._last_chat.get(chat_id, 0) < 1 / self.chat_rate:
+                TelegramStandIn.throttled += 1
+                return self._reply({
+                    'ok': False, 'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': 1}
+                }, status=429)
+
+            recent.append(now)
+            self._last_chat[chat_id] = now
+            self.sent.append([chat_id, now, JOB_ID_RE.findall(params.get('text', ''))])
+            message_id = len(self.sent)
+        self._reply({'ok': True, 'result': {'message_id': message_id}})
+
+    def _reply(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_getapro(ready, slugs: list, jobs_per_minute: float, backlog: int, seed: int):
+    """Child process: getapro stand-in plus the thread posting new jobs"""
+    from bench_parser import synthetic_card
+
+    rng = random.Random(seed)
+    # Zipf-like weights: the first categories are much busier than the rest
+    weights = [1 / (rank + 1) for rank in range(len(slugs))]
+    next_id = [500000]
+
+    def post(slug):
+        with GetaProStandIn.lock:
+            next_id[0] += 1
+            GetaProStandIn.jobs.setdefault(slug, []).append(synthetic_card(next_id[0], rng))
+            GetaProStandIn.created[str(next_id[0])] = time.time()
+
+    for slug in slugs:
+        for _ in range(backlog):
+            post(slug)
+
+    def arrivals():
+        while jobs_per_minute > 0:
+            time.sleep(rng.expovariate(jobs_per_minute / 60))
+            post(rng.choices(slugs, weights)[0])
+
+    threading.Thread(target=arrivals, daemon=True).start()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GetaProStandIn)
+    ready.put(f"http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+def serve_telegram(ready, global_rate: float, chat_rate: float):
+    """Child process: Telegram stand-in"""
+    TelegramStandIn.global_rate = global_rate
+    TelegramStandIn.chat_rate = chat_rate
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TelegramStandIn)
+    ready.put(f"http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+def start_stand_in(target, *args) -> tuple:
+    """Run a stand-in server in a child process, return (base URL, process)"""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=(ready, *args), daemon=True)
+    process.start()
+    return ready.get(timeout=30), process
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'p50': round(statistics.median(values), 2),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+        'max': round(values[-1], 2)
+    }
+
+
+def write_config(data_dir: str, slugs: list, args) -> dict:
+    """config.json for the monitor: owner follows every category, subscribers 1-3 each"""
+    rng = random.Random(args.seed)
+    subscriptions = {
+        str(100000 + number): {'categories': rng.sample(slugs, rng.randint(1, min(3, len(slugs))))}
+        for number in range(args.subscribers)
+    }
+    config = {
+        'telegram_bot_token': 'LOADTEST',
+        'telegram_chat_id': '1',
+        'enabled_categories': slugs,
+        'subscriptions': subscriptions,
+        'check_interval_minutes': args.max_interval / 60,
+        'min_check_interval_minutes': args.min_interval / 60,
+        'max_requests_per_hour': 0,
+        'requests_per_second': 20,
+        'long_poll_timeout': 5,
+        'telegram_global_rate': args.bot_global_rate,
+        'telegram_chat_rate': args.bot_chat_rate,
+    }
+    with open(os.path.join(data_dir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return subscriptions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load test the monitor against local stand-in servers")
+    arg_parser.add_argument('--duration', type=float, default=120, help="Seconds to run the monitor")
+    arg_parser.add_argument('--jobs-per-minute', type=float, default=120, help="Job arrival rate over all categories")
+    arg_parser.add_argument('--backlog', type=int, default=0, help="Jobs already listed per category at start")
+    arg_parser.add_argument('--categories', type=int, default=15, help="Number of categories in use")
+    arg_parser.add_argument('--subscribers', type=int, default=1000, help="Chats besides the owner")
+    arg_parser.add_argument('--min-interval', type=float, default=3, help="Shortest poll interval (seconds)")
+    arg_parser.add_argument('--max-interval', type=float, default=30, help="Longest poll interval (seconds)")
+    arg_parser.add_argument('--bot-global-rate', type=float, default=25, help="Monitor's telegram_global_rate")
+    arg_parser.add_argument('--bot-chat-rate', type=float, default=1, help="Monitor's telegram_chat_rate")
+    arg_parser.add_argument('--tg-global-rate', type=float, default=30, help="Stand-in's messages/s before 429")
+    arg_parser.add_argument('--tg-chat-rate', type=float, default=1, help="Stand-in's messages/s per chat before 429")
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = arg_parser.parse_args()
+
+    # The monitor reads its files from DATA_DIR when the module is loaded
+    data_dir = tempfile.mkdtemp(prefix='getapro-loadtest-')
+    os.environ['DATA_DIR'] = data_dir
+    for name in ('TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID', 'CHECK_INTERVAL_MINUTES', 'ENABLED_CATEGORIES',
+                 'WEBHOOK_URL', 'WEBHOOK_SECRET'):
+        os.environ.pop(name, None)
+    import scraper
+
+    slugs = list(scraper.GetaProScraper.CATEGORIES)[:args.categories]
+    getapro_url, getapro = start_stand_in(serve_getapro, slugs, args.jobs_per_minute, args.backlog, args.seed)
+    telegram_url, telegram = start_stand_in(serve_telegram, args.tg_global_rate, args.tg_chat_rate)
+    subscriptions = write_config(data_dir, slugs, args)
+
+    scraper.GetaProScraper.BASE_URL = getapro_url
+    scraper.GetaProScraper.JOBS_URL = getapro_url + '/job'
+    monitor = scraper.JobMonitor()
+    monitor.bot.api_url = f"{telegram_url}/botLOADTEST"
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.time()
+    runner = threading.Thread(target=monitor.run_continuous, args=(args.max_interval / 60,), daemon=True)
+    runner.start()
+    time.sleep(args.duration)
+    monitor.stop()
+    runner.join(timeout=30)
+    elapsed = time.time() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    created = requests.get(f"{getapro_url}/_stats", timeout=30).json()['created']
+    stats = requests.get(f"{telegram_url}/_stats", timeout=30).json()
+    getapro.terminate()
+    telegram.terminate()
+
+    # Latency only for jobs posted while the monitor ran
+    first_sent = {}
+    delivered = {}
+    for chat_id, sent_at, job_ids in stats['sent']:
+        for job_id in job_ids:
+            first_sent[job_id] = min(first_sent.get(job_id, sent_at), sent_at)
+            delivered[(chat_id, job_id)] = min(delivered.get((chat_id, job_id), sent_at), sent_at)
+    live = {job_id: posted for job_id, posted in created.items() if posted >= started}
+
+    followers = {}
+    for chat_id, settings in [('1', {'categories': slugs})] + list(subscriptions.items()):
+        for slug in settings['categories']:
+            followers[slug] = followers.get(slug, 0) + 1
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    report = {
+        'duration_s': round(elapsed, 1),
+        'categories': len(slugs),
+        'subscribers': len(subscriptions) + 1,
+        'jobs_posted': len(live),
+        'jobs_notified': sum(1 for job_id in live if job_id in first_sent),
+        'detection_latency_s': percentiles([first_sent[job_id] - live[job_id] for job_id in live if job_id in first_sent]),
+        'delivery_latency_s': percentiles([
+            sent_at - live[job_id] for (chat_id, job_id), sent_at in delivered.items() if job_id in live
+        ]),
+        'messages_sent': len(stats['sent']),
+        'messages_per_s': round(len(stats['sent']) / elapsed, 2),
+        'throttled_429': stats['throttled'],
+        'outbox_pending': monitor.outbox.pending_count(),
+        'cpu_s': round(cpu, 2),
+        'cpu_percent': round(100 * cpu / elapsed, 1),
+        'peak_rss_mb': round(usage_after.ru_maxrss / 1024, 1),
+        'busiest_category_followers': max(followers.values(), default=0),
+        'data_dir': data_dir
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+In-process metrics for the job monitor
+
+Counters, gauges and histograms with labels, kept in a process-wide
+registry and rendered in the Prometheus text exposition format. A small
+optional HTTP server exposes them at /metrics.
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Tuple
+
+# Seconds; covers fast local parses up to slow retried fetches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Tuple[str, ...], key: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        """Value of one label set, or the total over all label sets when none given"""
+        with self._lock:
+            if not labels:
+                return sum(self._values.values())
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+    
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self._values.items())
+        return "".join(
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}\n" for key, value in items
+        )
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, per label set"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+    
+    def _merged(self, labels: Dict) -> Optional[list]:
+        with self._lock:
+            if labels:
+                series = self._series.get(_label_key(self.labelnames, labels))
+                return list(series) if series else None
+            if not self._series:
+                return None
+            return [sum(column) for column in zip(*self._series.values())]
+    
+    def count(self, **labels) -> int:
+        series = self._merged(labels)
+        return sum(series[:-1]) if series else 0
+    
+    def mean(self, **labels) -> Optional[float]:
+        series = self._merged(labels)
+        count = sum(series[:-1]) if series else 0
+        return series[-1] / count if count else None
+    
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket, like Prometheus does"""
+        series = self._merged(labels)
+        count = sum(series[:-1]) if series else 0
+        if not count:
+            return None
+        
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(series[:-1]):
+            if bucket_count and seen + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+    
+    def render(self) -> str:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(float(bound))
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return "".join(line + "\n" for line in lines)
+
+
+class MetricsRegistry:
+    """Named metrics of the process; asking for an existing name returns it"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _get(self, cls, name: str, documentation: str, labelnames: Tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already a {metric.kind}")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "".join(
+            f"# HELP {metric.name} {metric.documentation}\n# TYPE {metric.name} {metric.kind}\n{metric.render()}"
+            for metric in metrics
+        )
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves a registry at GET /metrics for Prometheus to scrape"""
+    
+    def __init__(self, port: int, registry: MetricsRegistry = REGISTRY, host: str = '0.0.0.0'):
+        self.port = port
+        self.host = host
+        self.registry = registry
+        self._server = None
+    
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
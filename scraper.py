@@ -5,15 +5,46 @@ Scrapes jobs from getapro.lv and sends Telegram notifications for new jobs
 
 import os
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import json
 import time
 import base64
+import copy
+import hashlib
+import hmac
+import html
+import math
+import queue
+import random
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
 import logging
 
+from metrics import REGISTRY, MetricsServer
+from telegram_api import TelegramApiClient, TelegramApiError
+
+# Imported on first use to keep start-up short (see _load_lxml), as are
+# BeautifulSoup, the profilers and http.server
+etree = None
+_lxml_missing = False
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode 'br' responses
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,9 +52,523 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Metrics, exposed on metrics_port and summarised in /status
+FETCH_SECONDS = REGISTRY.histogram('getapro_fetch_seconds', 'Duration of getapro.lv requests', ('status',))
+FETCH_BYTES = REGISTRY.counter('getapro_fetch_bytes_total', 'Decoded bytes of getapro.lv responses')
+LISTING_CACHE = REGISTRY.counter(
+    'getapro_listing_cache_total', 'Listing lookups by how they were answered', ('result',)
+)
+PARSE_SECONDS = REGISTRY.histogram('getapro_parse_seconds', 'Duration of parsing a listing page', ('parser',))
+CARDS_PARSED = REGISTRY.counter('getapro_cards_parsed_total', 'Job cards parsed')
+DEDUPE_SECONDS = REGISTRY.histogram('monitor_dedupe_seconds', 'Duration of filtering out seen jobs')
+JOBS_SCRAPED = REGISTRY.counter('monitor_jobs_scraped_total', 'Jobs returned by checks')
+JOBS_NEW = REGISTRY.counter('monitor_jobs_new_total', 'Jobs not seen before')
+CYCLE_SECONDS = REGISTRY.histogram('monitor_cycle_seconds', 'Duration of a check cycle')
+SEND_SECONDS = REGISTRY.histogram('telegram_send_seconds', 'Duration of notification sends', ('outcome',))
+NOTIFY_DELAY = REGISTRY.histogram(
+    'telegram_notify_delay_seconds', 'Time from queuing a notification to its delivery'
+)
+OUTBOX_PENDING = REGISTRY.gauge('telegram_outbox_pending', 'Notifications waiting in the outbox')
+
 # File paths
-CONFIG_FILE = Path(__file__).parent / "config.json"
-SEEN_JOBS_FILE = Path(__file__).parent / "seen_jobs.json"
+# Config and state files live next to the script unless DATA_DIR points elsewhere
+DATA_DIR = Path(os.environ.get('DATA_DIR') or Path(__file__).parent)
+CONFIG_FILE = DATA_DIR / "config.json"
+SEEN_JOBS_FILE = DATA_DIR / "seen_jobs.json"  # legacy, migrated on start
+SEEN_JOBS_DB = DATA_DIR / "seen_jobs.db"
+SEEN_JOBS_LOG = DATA_DIR / "seen_jobs.log"
+OUTBOX_DB = DATA_DIR / "outbox.db"
+DETAILS_DB = DATA_DIR / "job_details.db"
+JOB_ARCHIVE_DB = DATA_DIR / "job_archive.db"
+PROFILES_DIR = DATA_DIR / "profiles"
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host, shared between worker threads"""
+    
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url: str):
+        """Block until the next request slot for the URL's host is free"""
+        if not self.min_interval:
+            return
+        
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of a request while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling something that keeps failing.
+    
+    Closed: calls pass. After failure_threshold consecutive failures the
+    breaker opens and rejects calls for reset_timeout seconds, then
+    half-opens to let a single trial call through: success closes it,
+    failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+    
+    def release(self):
+        """Give back an allowed call that was not made"""
+        with self._lock:
+            self._trial_running = False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+    
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a trial call through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+
+def _load_lxml() -> bool:
+    """Import lxml.etree into the module on first use; False if it isn't installed"""
+    global etree, _lxml_missing
+    if etree is None and not _lxml_missing:
+        try:
+            from lxml import etree as lxml_etree
+        except ImportError:
+            _lxml_missing = True
+        else:
+            etree = lxml_etree
+    return etree is not None
+
+
+def _class_xpath(class_name: str) -> str:
+    """XPath predicate equivalent to the CSS selector .class_name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+class SoupListingParser:
+    """BeautifulSoup listing parser (pure Python fallback when lxml is missing)"""
+    
+    name = "soup"
+    
+    def __init__(self):
+        from bs4 import SoupStrainer
+        # Only the job card subtrees are turned into Tag objects
+        self._strainer = SoupStrainer(attrs={'class': lambda c: bool(c) and 'job-list-item' in c.split()})
+    
+    def iter_cards(self, html: str) -> List:
+        """Return the job card elements of a listing page"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser', parse_only=self._strainer)
+        return soup.select('.job-list-item')
+    
+    def card_fields(self, card) -> Dict:
+        """Extract the raw field strings of a job card"""
+        content_elem = card.select_one('.job-list__content p')
+        subcategory_elem = card.select_one('.job-post-tags li:first-child i')
+        price_elem = card.select_one('.job-post-tags li.price i')
+        time_elem = card.select_one('.job-post-tags li.time i')
+        address_elem = card.select_one('.address')
+        
+        return {
+            'id': card.get('data-id'),
+            'name': card.get('data-name', ''),
+            'brand': card.get('data-brand', ''),
+            'price_value': card.get('data-price', '0'),
+            'variant': card.get('data-variant', ''),
+            'href': card.get('data-href', ''),
+            'description': content_elem.get_text(strip=True) if content_elem else "",
+            'subcategory': subcategory_elem.get_text(strip=True) if subcategory_elem else "",
+            'price': price_elem.get_text(strip=True) if price_elem else "",
+            'time_posted': time_elem.get_text(strip=True) if time_elem else "",
+            'address': address_elem.get_text(strip=True) if address_elem is not None else None
+        }
+
+
+class LxmlListingParser:
+    """lxml listing parser with precompiled XPath selectors"""
+    
+    name = "lxml"
+    
+    def __init__(self):
+        if not _load_lxml():
+            raise ImportError("lxml is not installed")
+        self._cards = etree.XPath(f"//*[{_class_xpath('job-list-item')}]")
+        self._description = etree.XPath(f".//*[{_class_xpath('job-list__content')}]//p")
+        self._subcategory = etree.XPath(f".//*[{_class_xpath('job-post-tags')}]//li[not(preceding-sibling::*)]//i")
+        self._price = etree.XPath(f".//*[{_class_xpath('job-post-tags')}]//li[{_class_xpath('price')}]//i")
+        self._time = etree.XPath(f".//*[{_class_xpath('job-post-tags')}]//li[{_class_xpath('time')}]//i")
+        self._address = etree.XPath(f".//*[{_class_xpath('address')}]")
+    
+    def iter_cards(self, html: str) -> List:
+        """Return the job card elements of a listing page"""
+        if not html.strip():
+            return []
+        # HTMLParser objects are not thread-safe, so each call gets a fresh one
+        root = etree.fromstring(html, etree.HTMLParser(remove_comments=True))
+        return self._cards(root) if root is not None else []
+    
+    @staticmethod
+    def _text(elements) -> str:
+        """First element's text, joined like BeautifulSoup's get_text(strip=True)"""
+        if not elements:
+            return ""
+        return ''.join(part.strip() for part in elements[0].itertext())
+    
+    def card_fields(self, card) -> Dict:
+        """Extract the raw field strings of a job card"""
+        address = self._address(card)
+        
+        return {
+            'id': card.get('data-id'),
+            'name': card.get('data-name', ''),
+            'brand': card.get('data-brand', ''),
+            'price_value': card.get('data-price', '0'),
+            'variant': card.get('data-variant', ''),
+            'href': card.get('data-href', ''),
+            'description': self._text(self._description(card)),
+            'subcategory': self._text(self._subcategory(card)),
+            'price': self._text(self._price(card)),
+            'time_posted': self._text(self._time(card)),
+            'address': self._text(address) if address else None
+        }
+
+
+LISTING_PARSERS = {
+    'lxml': LxmlListingParser,
+    'soup': SoupListingParser,
+}
+
+
+def create_listing_parser(name: str = "auto"):
+    """Create a listing parser by name, falling back to BeautifulSoup"""
+    if name == "auto":
+        name = "lxml" if _load_lxml() else "soup"
+    
+    parser_class = LISTING_PARSERS.get(name)
+    if parser_class is None:
+        logger.warning(f"Unknown parser '{name}', using BeautifulSoup")
+        return SoupListingParser()
+    
+    try:
+        return parser_class()
+    except ImportError as e:
+        logger.warning(f"Parser '{name}' unavailable ({e}), using BeautifulSoup")
+        return SoupListingParser()
+
+
+# Amount in a price text: "1 200", "1.200", "1,200", "12,50"; the first of a range
+PRICE_NUMBER_RE = re.compile(r'\d+(?:[ \u00a0\u202f.,]\d{3}(?!\d))*(?:[.,]\d{1,2})?')
+CURRENCIES = {'€': 'EUR', 'eur': 'EUR', 'eiro': 'EUR', '$': 'USD', 'usd': 'USD', '£': 'GBP', 'gbp': 'GBP'}
+
+
+def parse_price(text: Optional[str], data_price: Optional[str] = None) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Numeric price and currency of a job card.
+    
+    The first amount in the shown price text is used (the lower end of
+    "50-80 €"), so filters agree with what the message says; the card's
+    data-price fills in when the text has no amount. Prices without a
+    currency are in euro, as everything on getapro.lv is.
+    
+    Returns:
+        (amount, ISO currency code), or (None, None) for "Nav norādīts",
+        "Līgumcena" and the like
+    """
+    value = None
+    match = PRICE_NUMBER_RE.search(text or "")
+    if match:
+        number = re.sub(r'[ \u00a0\u202f]', '', match.group(0))
+        # A dot or comma followed by exactly three digits groups thousands,
+        # otherwise it's a decimal mark
+        number = re.sub(r'[.,](?=\d{3}(?!\d))', '', number).replace(',', '.')
+        value = float(number) or None
+    
+    if value is None:
+        try:
+            value = float(data_price) if data_price and float(data_price) > 0 else None
+        except ValueError:
+            pass
+    
+    if value is None:
+        return None, None
+    
+    lowered = (text or "").casefold()
+    for symbol, code in CURRENCIES.items():
+        if symbol in lowered:
+            return value, code
+    return value, 'EUR'
+
+
+class Job(MutableMapping):
+    """
+    One job card, readable and writable like the dict it replaces.
+    
+    Fields live in slots instead of a per-card dict. The URL is decoded
+    from data-href and scraped_at formatted only when asked for, and every
+    card of a page shares the page's scrape time. Keys outside the card
+    fields (detail page fields and the like) go to a small side dict.
+    
+    Parsed and cached jobs stay in this form; scrape_jobs and
+    scrape_all_categories hand out plain dict copies (to_dict), so their
+    callers can json.dumps, copy() and isinstance-check them as before.
+    The monitor reads the records themselves (scrape_category_records)
+    and copies only the new jobs.
+    """
+    
+    FIELDS = ('id', 'title', 'description', 'category', 'subcategory', 'price', 'price_value',
+              'currency', 'location', 'time_posted', 'url', 'date_posted', 'scraped_at')
+    _SLOT_FIELDS = frozenset(FIELDS) - {'url', 'scraped_at'}
+    
+    __slots__ = ('id', 'title', 'description', 'category', 'subcategory', 'price', 'price_value',
+                 'currency', 'location', 'time_posted', 'date_posted', 'category_slug', '_href',
+                 '_base_url', '_url', '_scraped_at', '_extra')
+    
+    def __init__(self, id: str, title: str, description: str, category: str, subcategory: Optional[str],
+                 price: str, price_value: Optional[float], currency: Optional[str], location: str,
+                 time_posted: Optional[str], date_posted: Optional[str], href: Optional[str],
+                 base_url: str, scraped_at: float):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.category = category
+        self.subcategory = subcategory
+        self.price = price
+        self.price_value = price_value
+        self.currency = currency
+        self.location = location
+        self.time_posted = time_posted
+        self.date_posted = date_posted
+        self.category_slug = None
+        self._href = href
+        self._base_url = base_url
+        self._url = None
+        self._scraped_at = scraped_at
+        self._extra = None
+    
+    @property
+    def url(self) -> str:
+        if self._url is None:
+            # data-href is the base64 encoded detail page path
+            try:
+                self._url = self._base_url + base64.b64decode(self._href).decode('utf-8')
+            except Exception:
+                self._url = f"{self._base_url}/job/details/{self.id}"
+        return self._url
+    
+    @property
+    def scraped_at(self) -> str:
+        if isinstance(self._scraped_at, float):
+            self._scraped_at = datetime.fromtimestamp(self._scraped_at).isoformat()
+        return self._scraped_at
+    
+    def __getitem__(self, key: str):
+        if key in self._SLOT_FIELDS or key == 'url' or key == 'scraped_at':
+            return getattr(self, key)
+        if key == 'category_slug' and self.category_slug is not None:
+            return self.category_slug
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value):
+        if key in self._SLOT_FIELDS or key == 'category_slug':
+            setattr(self, key, value)
+        elif key == 'url':
+            self._url = value
+        elif key == 'scraped_at':
+            self._scraped_at = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key: str):
+        if key == 'category_slug' and self.category_slug is not None:
+            self.category_slug = None
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+    
+    def __iter__(self):
+        yield from self.FIELDS
+        if self.category_slug is not None:
+            yield 'category_slug'
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (self.category_slug is not None) + len(self._extra or ())
+    
+    def __repr__(self) -> str:
+        return f"Job({self.to_dict()!r})"
+    
+    def to_dict(self) -> Dict:
+        """Plain dict copy, e.g. for JSON"""
+        return dict(self)
+
+
+class PageCache:
+    """
+    Per-URL HTTP validators, listing signature and last parsed jobs.
+    
+    Shared by everything scraping through one GetaProScraper, so entries
+    younger than the TTL are served without a request. Holds at most
+    max_jobs parsed jobs in total, evicting the least recently used pages.
+    
+    An entry cut short by an early stop keeps the page's card region in
+    'html', so a later full scrape can parse the skipped cards from it
+    instead of fetching the page again.
+    """
+    
+    def __init__(self, max_jobs: int = 2000):
+        self.max_jobs = max_jobs
+        self._entries = OrderedDict()
+        self._job_count = 0
+        self._lock = threading.Lock()
+    
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+    
+    def fresh(self, url: str, max_age: float, early_stop: bool = False) -> Optional[Dict]:
+        """The entry for url if fetched within max_age seconds and usable by the caller"""
+        entry = self.get(url)
+        if not entry or time.time() - entry['fetched_at'] > max_age:
+            return None
+        # A page cut short by an early stop serves others once completed from its HTML
+        if not (entry['complete'] or early_stop or entry.get('html')):
+            return None
+        return entry
+    
+    def put(self, url: str, entry: Dict):
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._job_count -= len(previous['jobs'])
+            self._entries[url] = entry
+            self._job_count += len(entry['jobs'])
+            
+            while self._job_count > self.max_jobs and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._job_count -= len(evicted['jobs'])
+
+
+# Fields a job's detail page adds (see parse_job_details)
+DETAIL_FIELDS = ('full_description',)
+DETAIL_DESCRIPTION_SELECTORS = (
+    '.job-details__description', '.job-description', '.job-view__description',
+    '.job-details__content', '[itemprop="description"]',
+)
+
+
+def parse_job_details(html_text: str) -> Dict:
+    """
+    Extract full_description from a job detail page.
+    
+    The detail page layout is not documented, so this tries the likely
+    description containers and falls back to the og:description meta tag;
+    without either, nothing is extracted. Budget and deadline are left
+    out until there's a recorded page to parse them against.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_text, 'html.parser')
+    details = {}
+    
+    for selector in DETAIL_DESCRIPTION_SELECTORS:
+        element = soup.select_one(selector)
+        if element and element.get_text(strip=True):
+            details['full_description'] = element.get_text('\n', strip=True)
+            break
+    else:
+        meta = soup.find('meta', attrs={'property': 'og:description'})
+        if meta and meta.get('content', '').strip():
+            details['full_description'] = meta['content'].strip()
+    
+    return details
+
+
+class DetailCache:
+    """Parsed job detail pages by job ID, in SQLite so restarts don't refetch them"""
+    
+    def __init__(self, path: Path = None, max_age_days: float = 30):
+        self.path = path or DETAILS_DB
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS details "
+                    "(job_id TEXT PRIMARY KEY, fetched_at REAL NOT NULL, payload TEXT NOT NULL) WITHOUT ROWID"
+                )
+                self._db.execute("DELETE FROM details WHERE fetched_at < ?", (time.time() - max_age_days * 86400,))
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM details WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, job_id: str, details: Dict):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO details (job_id, fetched_at, payload) VALUES (?, ?, ?)",
+                (job_id, time.time(), json.dumps(details, ensure_ascii=False))
+            )
+    
+    def close(self):
+        self._db.close()
 
 
 class GetaProScraper:
@@ -32,6 +577,14 @@ class GetaProScraper:
     BASE_URL = "https://getapro.lv"
     JOBS_URL = "https://getapro.lv/job"
     
+    # Opening tag of each job card; it carries every data-* field we use
+    # (either quote style; markup they miss falls back to a full parse)
+    CARD_TAG_RE = re.compile(r'<[^>]+class=["\'][^"\']*\bjob-list-item\b[^"\']*["\'][^>]*>')
+    CARD_ID_RE = re.compile(r'\bdata-id=["\']([^"\']*)["\']')
+    
+    # Responses worth retrying: rate limited or a temporary server failure
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
     # All available categories with their URL slugs
     CATEGORIES = {
         "celtniecibas-darbi": {
@@ -126,23 +679,91 @@ class GetaProScraper:
         }
     }
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, requests_per_second: float = 2.0, parser: str = "auto",
+                 cache_ttl: float = 0, cache_max_jobs: int = 2000, max_retries: int = 2,
+                 retry_backoff: float = 1.0, breaker_failures: int = 3, breaker_reset: float = 300.0):
+        """
+        Args:
+            max_workers: Max category pages fetched in parallel (1 = sequential)
+            requests_per_second: Politeness limit per host, shared by all workers
+            parser: Listing parser backend ("auto", "lxml" or "soup")
+            cache_ttl: Seconds a fetched listing is served from memory without
+                a request (0 = always revalidate)
+            cache_max_jobs: Max parsed jobs kept in the listing cache
+            max_retries: Retries of a failed fetch (connection errors, 429, 5xx)
+            retry_backoff: Base delay of the jittered exponential backoff (seconds)
+            breaker_failures: Failed fetches in a row that open a host's or
+                category's circuit breaker
+            breaker_reset: Seconds an open breaker waits before a trial fetch
+        """
+        self.parser_name = parser
+        self._parser = None
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.cache_ttl = cache_ttl
+        self.page_cache = PageCache(cache_max_jobs)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._host_breakers = {}
+        self._category_breakers = {}
+        self._breaker_lock = threading.Lock()
+        
         self.session = requests.Session()
+        # One pooled connection per worker so parallel fetches reuse keep-alive
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'lv,en;q=0.9',
+            'Accept-Encoding': ACCEPT_ENCODING,
         })
     
-    def scrape_jobs(self, category_slug: Optional[str] = None) -> List[Dict]:
+    @property
+    def parser(self):
+        """Listing parser backend, created (and lxml imported) when first needed"""
+        if self._parser is None:
+            self._parser = create_listing_parser(self.parser_name)
+        return self._parser
+    
+    def scrape_jobs(self, category_slug: Optional[str] = None, known_ids=None,
+                    high_water: Optional[int] = None, max_pages: int = 1,
+                    max_age: Optional[float] = None) -> List[Dict]:
+        """
+        Scrape jobs from GetaPro.lv (see scrape_job_records for the arguments)
+        
+        Returns:
+            List of plain job dicts (newest first); the compact Job records
+            stay in the listing cache
         """
-        Scrape jobs from GetaPro.lv
+        return self._as_dicts(self.scrape_job_records(category_slug, known_ids, high_water, max_pages, max_age))
+    
+    def scrape_job_records(self, category_slug: Optional[str] = None, known_ids=None,
+                           high_water: Optional[int] = None, max_pages: int = 1,
+                           max_age: Optional[float] = None) -> List[Job]:
+        """
+        Scrape jobs from GetaPro.lv as Job records
         
         Args:
             category_slug: Optional category slug to filter jobs
+            known_ids: Optional container of already seen job IDs; cards
+                found in it are skipped without being parsed, and no further
+                pages are followed
+            high_water: Optional highest job ID seen in this category before;
+                further pages are only followed when it is set, and not past
+                a card at or below it. Without known_ids, such cards also
+                count as known; with known_ids, only membership decides, so a
+                late-published job with a lower ID isn't lost
+            max_pages: Max listing pages to follow while every card is new
+            max_age: Serve a cached listing fetched within this many seconds
+                without a request (defaults to cache_ttl)
             
         Returns:
-            List of job dictionaries
+            List of Job records (newest first), shared with the listing
+            cache: read them, or copy them (to_dict) before changing them
         """
         if category_slug and category_slug in self.CATEGORIES:
             url = self.BASE_URL + self.CATEGORIES[category_slug]["url"]
@@ -151,115 +772,534 @@ class GetaProScraper:
             url = self.JOBS_URL
             category_name = "Visi"
         
+        early_stop = known_ids is not None or high_water is not None
+        
+        max_age = self.cache_ttl if max_age is None else max_age
+        if max_age > 0:
+            cached = self.page_cache.fresh(url, max_age, early_stop)
+            if cached:
+                if not (cached['complete'] or early_stop):
+                    cached = self._complete_entry(cached, category_name, category_slug or "")
+                    self.page_cache.put(url, cached)
+                LISTING_CACHE.inc(result='fresh')
+                logger.info(f"Using {len(cached['jobs'])} cached jobs in category: {category_name}")
+                return list(cached['jobs'])
+        
         logger.info(f"Scraping jobs from: {url}")
         
+        # A cache entry cut short by an early stop only serves early-stop calls,
+        # unless the skipped cards can still be parsed from its HTML
+        cached = self.page_cache.get(url)
+        if cached and not (cached['complete'] or early_stop or cached.get('html')):
+            cached = None
+        
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
         try:
-            response = self.session.get(url, timeout=30)
+            response = self._fetch(url, headers=headers, category=category_slug)
+            if response.status_code == 304 and cached:
+                LISTING_CACHE.inc(result='not_modified')
+                cached = dict(cached, fetched_at=time.time())
+                if not (cached['complete'] or early_stop):
+                    cached = self._complete_entry(cached, category_name, category_slug or "")
+                self.page_cache.put(url, cached)
+                logger.info(f"Not modified, reusing {len(cached['jobs'])} jobs in category: {category_name}")
+                return list(cached['jobs'])
             response.raise_for_status()
         except requests.RequestException as e:
             logger.error(f"Failed to fetch jobs: {e}")
             return []
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Servers without validators: compare the card region instead
+        signature = self._listing_signature(response.text)
+        if cached and signature is not None and cached['signature'] == signature:
+            LISTING_CACHE.inc(result='unchanged')
+            cached = self._cache_entry(response, signature, cached['jobs'], cached['complete'], cached.get('html'))
+            if not (cached['complete'] or early_stop):
+                cached = self._complete_entry(cached, category_name, category_slug or "")
+            self.page_cache.put(url, cached)
+            logger.info(f"Listing unchanged, reusing {len(cached['jobs'])} jobs in category: {category_name}")
+            return list(cached['jobs'])
+        
+        LISTING_CACHE.inc(result='parsed')
+        jobs, stopped = self._parse_new_cards(
+            response.text, category_name, known_ids, high_water, category_slug or ""
+        )
+        
+        if stopped and cached and cached['complete']:
+            # The known cards were in the previous listing already
+            new_ids = {job['id'] for job in jobs}
+            kept = [job for job in cached['jobs'] if job['id'] not in new_ids]
+            page_jobs = (jobs + kept)[:max(len(cached['jobs']), len(jobs))]
+            self.page_cache.put(url, self._cache_entry(response, signature, page_jobs))
+        elif stopped:
+            self.page_cache.put(url, self._cache_entry(response, signature, jobs, False,
+                                                       self._card_region(response.text)))
+        else:
+            self.page_cache.put(url, self._cache_entry(response, signature, jobs))
+        
+        # Every card on the page was new: the burst may continue on later pages
+        page = 1
+        collected = {job['id'] for job in jobs}
+        while not stopped and high_water is not None and jobs and page < max_pages:
+            page += 1
+            try:
+                response = self._fetch(url, params={'page': page}, category=category_slug)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.error(f"Failed to fetch page {page}: {e}")
+                break
+            
+            page_jobs, stopped = self._parse_new_cards(
+                response.text, category_name, known_ids, high_water, category_slug or ""
+            )
+            fresh = [job for job in page_jobs if job['id'] not in collected]
+            if not fresh:
+                break
+            
+            jobs.extend(fresh)
+            collected.update(job['id'] for job in fresh)
+            logger.info(f"Page {page}: {len(fresh)} more jobs in category: {category_name}")
+        
+        logger.info(f"Found {len(jobs)} jobs in category: {category_name}")
+        return jobs
+    
+    def _complete_entry(self, entry: Dict, category_name: str, category_slug: str) -> Dict:
+        """
+        Parse the cards an early-stopped fetch skipped from the entry's HTML.
+        
+        Jobs parsed already are reused; the completed entry no longer keeps
+        the HTML and is for the caller to store.
+        """
+        html = entry['html']
+        parsed = {job['id']: job for job in entry['jobs']}
+        cards = self.scan_card_ids(html)
+        if cards:
+            missing = [card for card in cards if card[0] not in parsed]
+            for job in self.parse_cards(html, missing, category_name):
+                job['category_slug'] = category_slug
+                parsed[job['id']] = job
+            jobs = [parsed[card[0]] for card in cards if card[0] in parsed]
+        else:
+            jobs = [parsed.get(job['id'], job) for job in self.parse_listing(html, category_name)]
+            for job in jobs:
+                job['category_slug'] = category_slug
+        
+        return dict(entry, jobs=jobs, complete=True, html=None)
+    
+    @staticmethod
+    def _as_dicts(jobs: List[Job]) -> List[Dict]:
+        """Plain dict copies of parsed jobs, so callers never share the cached records"""
+        return [job.to_dict() for job in jobs]
+    
+    def _parse_new_cards(self, html: str, category_name: str, known_ids=None,
+                         high_water: Optional[int] = None, category_slug: str = "") -> tuple:
+        """
+        Parse only the cards of a listing page that aren't known yet.
+        
+        When the card scan finds no cards, the whole page is parsed
+        instead, so a markup change the scan misses can't hide new jobs.
+        
+        Returns:
+            (new jobs, whether a known card or one at or below high_water
+            was found on the page, i.e. older pages needn't be followed)
+        """
+        def below_mark(job_id: str) -> bool:
+            return high_water is not None and job_id.isdigit() and int(job_id) <= high_water
+        
+        def is_new(job_id: str) -> bool:
+            if known_ids is not None:
+                return job_id not in known_ids
+            return not below_mark(job_id)
+        
+        def reached_known(job_ids: List[str], new_count: int) -> bool:
+            return new_count < len(job_ids) or any(below_mark(job_id) for job_id in job_ids)
+        
+        cards = None
+        if known_ids is not None or high_water is not None:
+            cards = self.scan_card_ids(html)
+        
+        if cards:
+            new_cards = [card for card in cards if is_new(card[0])]
+            jobs = self.parse_cards(html, new_cards, category_name)
+            stopped = reached_known([card[0] for card in cards], len(new_cards))
+        else:
+            jobs = self.parse_listing(html, category_name)
+            if cards is not None and jobs:
+                # The card markup changed under the scan: don't miss jobs over it
+                logger.warning(f"Card scan found no cards but the parser found {len(jobs)} in "
+                               f"{category_name}, the listing markup may have changed")
+            new_jobs = [job for job in jobs if is_new(job['id'])]
+            jobs, stopped = new_jobs, reached_known([job['id'] for job in jobs], len(new_jobs))
+        
+        for job in jobs:
+            job['category_slug'] = category_slug
+        return jobs, stopped
+    
+    def scan_card_ids(self, html: str) -> List[Tuple[str, int, int]]:
+        """
+        First phase of a two-phase parse: find the cards without parsing them.
+        
+        Only the cards' opening tags are matched, so this costs a regex pass
+        over the page. Each card spans from its opening tag to the next
+        card's (or the end of the page).
+        
+        Returns:
+            (job ID, start, end) of every card, in page order
+        """
+        starts = []
+        for match in self.CARD_TAG_RE.finditer(html):
+            id_match = self.CARD_ID_RE.search(match.group(0))
+            if id_match and id_match.group(1):
+                starts.append((id_match.group(1), match.start()))
+        
+        ends = [start for _, start in starts[1:]] + [len(html)]
+        return [(job_id, start, end) for (job_id, start), end in zip(starts, ends)]
+    
+    def parse_cards(self, html: str, cards: List[Tuple[str, int, int]], category_name: str,
+                    parser=None) -> List[Job]:
+        """
+        Second phase: fully parse only the given cards of scan_card_ids(html).
+        
+        The cards' slices are joined and parsed in one go, so picking 2 cards
+        out of 50 costs about as much as a page of 2.
+        """
+        if not cards:
+            return []
+        cards = sorted(cards, key=lambda card: card[1])
+        return self.parse_listing(''.join(html[start:end] for _, start, end in cards), category_name, parser)
+    
+    def _breaker(self, breakers: Dict[str, CircuitBreaker], key: str) -> CircuitBreaker:
+        with self._breaker_lock:
+            if key not in breakers:
+                breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            return breakers[key]
+    
+    def circuit_breakers(self) -> List[Tuple[str, CircuitBreaker]]:
+        """(display name, breaker) of every host and category fetched so far"""
+        with self._breaker_lock:
+            hosts = list(self._host_breakers.items())
+            categories = list(self._category_breakers.items())
+        return hosts + [
+            (self.CATEGORIES.get(slug, {}).get('name', slug), breaker)
+            for slug, breaker in categories
+        ]
+    
+    def _fetch(self, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+               category: Optional[str] = None) -> requests.Response:
+        """
+        GET a page through the shared session, respecting the per-host rate.
+        
+        Fails fast with CircuitOpenError while the category's or host's
+        circuit breaker is open. The outcome after retries counts towards
+        both breakers; other 4xx responses mean the host is up.
+        """
+        host = urlparse(url).netloc
+        breakers = [
+            self._breaker(self._category_breakers, category or url),
+            self._breaker(self._host_breakers, host)
+        ]
+        for position, breaker in enumerate(breakers):
+            if not breaker.allow():
+                for allowed in breakers[:position]:
+                    allowed.release()
+                raise CircuitOpenError(f"Circuit open for {category or host}, retry in {breaker.retry_in():.0f}s")
+        
+        try:
+            response = self._fetch_with_retries(url, headers, params)
+        except requests.RequestException:
+            for breaker in breakers:
+                breaker.record_failure()
+            raise
+        
+        for breaker in breakers:
+            if response.status_code in self.RETRY_STATUSES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return response
+    
+    def _fetch_with_retries(self, url: str, headers: Optional[Dict], params: Optional[Dict]) -> requests.Response:
+        """GET with up to max_retries retries of connection errors, timeouts, 429 and 5xx"""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(url)
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                FETCH_SECONDS.observe(time.perf_counter() - started, status='error')
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Fetch of {url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                FETCH_SECONDS.observe(time.perf_counter() - started, status=response.status_code)
+                FETCH_BYTES.inc(len(response.content))
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                logger.warning(f"HTTP {response.status_code} from {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with jitter, or the server's Retry-After if longer (capped at 60s)"""
+        delay = self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return min(delay, 60.0)
+    
+    def _listing_signature(self, html: str) -> Optional[str]:
+        """
+        Hash of the job cards' opening tags.
+        
+        Card bodies contain relative times ("pirms 5 min") that change on
+        every poll, so only the data-* attributes are fingerprinted.
+        
+        Returns:
+            The hash, or None when no card tag matched: the page can't be
+            fingerprinted then (an empty listing or changed markup)
+        """
+        digest = hashlib.sha1()
+        matched = False
+        for match in self.CARD_TAG_RE.finditer(html):
+            digest.update(match.group(0).encode('utf-8'))
+            matched = True
+        return digest.hexdigest() if matched else None
+    
+    def _card_region(self, html: str) -> str:
+        """The part of a listing page from its first card on"""
+        match = self.CARD_TAG_RE.search(html)
+        return html[match.start():] if match else html
+    
+    @staticmethod
+    def _cache_entry(response: requests.Response, signature: Optional[str], jobs: List[Dict],
+                     complete: bool = True, html: Optional[str] = None) -> Dict:
+        return {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'signature': signature,
+            'jobs': list(jobs),
+            'complete': complete,
+            'html': html,
+            'fetched_at': time.time()
+        }
+    
+    def parse_listing(self, html: str, category_name: str, parser=None) -> List[Job]:
+        """Parse all job cards of a listing page"""
+        parser = parser or self.parser
         jobs = []
+        started = time.perf_counter()
+        scraped_at = time.time()
         
-        # Find all job cards using the correct class
-        job_cards = soup.select('.job-list-item')
+        # Skip everything before the first card (head, navigation, filters)
+        region = self._card_region(html)
         
-        # Parse each job card
-        for card in job_cards:
+        for card in parser.iter_cards(region):
             try:
-                job = self._parse_job_card(card, category_name)
+                job = self._parse_job_card(card, category_name, parser, scraped_at)
                 if job:
                     jobs.append(job)
             except Exception as e:
                 logger.debug(f"Failed to parse job card: {e}")
                 continue
         
-        logger.info(f"Found {len(jobs)} jobs in category: {category_name}")
+        PARSE_SECONDS.observe(time.perf_counter() - started, parser=parser.name)
+        CARDS_PARSED.inc(len(jobs))
         return jobs
     
-    def _parse_job_card(self, card, category_name: str) -> Optional[Dict]:
+    def check_parser_parity(self, html: str, category_name: str = "") -> List[str]:
+        """
+        Parse a page with every available backend and compare the job dicts.
+        
+        Returns:
+            List of differences (empty when all backends agree)
+        """
+        reference_parser = SoupListingParser()
+        reference = self.parse_listing(html, category_name, reference_parser)
+        differences = []
+        
+        for name in LISTING_PARSERS:
+            if name == reference_parser.name:
+                continue
+            try:
+                parser = LISTING_PARSERS[name]()
+            except ImportError:
+                continue
+            
+            jobs = self.parse_listing(html, category_name, parser)
+            if len(jobs) != len(reference):
+                differences.append(f"{name}: {len(jobs)} jobs, soup: {len(reference)} jobs")
+                continue
+            
+            for job, expected in zip(jobs, reference):
+                for key in expected:
+                    if key != 'scraped_at' and job.get(key) != expected[key]:
+                        differences.append(f"{name}: job {expected['id']} {key}={job.get(key)!r}, soup: {expected[key]!r}")
+        
+        return differences
+    
+    def _parse_job_card(self, card, category_name: str, parser=None,
+                        scraped_at: Optional[float] = None) -> Optional[Job]:
         """Parse a single job card element using data attributes and HTML structure"""
+        fields = (parser or self.parser).card_fields(card)
         
         # Get data from attributes (most reliable)
-        job_id = card.get('data-id')
+        job_id = fields['id']
         if not job_id:
             return None
         
-        title = card.get('data-name', '')
-        location = card.get('data-brand', '')  # 'brand' is location in their system
-        price_value = card.get('data-price', '0')
-        date_posted = card.get('data-variant', '')
-        
-        # Get the URL from data-href (base64 encoded)
-        data_href = card.get('data-href', '')
-        job_url = ""
-        if data_href:
-            try:
-                decoded_path = base64.b64decode(data_href).decode('utf-8')
-                job_url = self.BASE_URL + decoded_path
-            except Exception:
-                job_url = f"{self.BASE_URL}/job/details/{job_id}"
-        else:
-            job_url = f"{self.BASE_URL}/job/details/{job_id}"
-        
-        # Get description from content section
-        content_elem = card.select_one('.job-list__content p')
-        description = content_elem.get_text(strip=True) if content_elem else ""
-        description = description.strip('"').strip()
+        # Get location from address span (more accurate than data attribute,
+        # where 'brand' is the location in their system)
+        location = fields['address'] if fields['address'] is not None else fields['brand']
+        price = fields['price']
+        price_value, currency = parse_price(price, fields['price_value'])
+        
+        return Job(
+            id=job_id,  # Use the actual job ID from the site
+            title=fields['name'],
+            description=fields['description'].strip('"').strip(),
+            category=category_name,
+            subcategory=fields['subcategory'],
+            price=price if price and price != 'Nav norādīts' else 'Nav norādīts',
+            price_value=price_value,
+            currency=currency,
+            location=location or 'Nav norādīts',
+            time_posted=fields['time_posted'],
+            date_posted=fields['variant'],
+            href=fields['href'],  # Decoded into the URL when first needed
+            base_url=self.BASE_URL,
+            scraped_at=scraped_at or time.time()
+        )
+    
+    def enrich_jobs(self, jobs: List[Dict], cache: DetailCache, max_workers: int = 4,
+                    timeout: float = 10.0) -> int:
+        """
+        Add full_description from each job's detail page.
         
-        # Get subcategory from the first list item
-        subcategory_elem = card.select_one('.job-post-tags li:first-child i')
-        subcategory = subcategory_elem.get_text(strip=True) if subcategory_elem else ""
+        Pages are fetched up to max_workers at a time (and within the
+        per-host rate) and cached by job ID. Returns after at most timeout
+        seconds: jobs whose page isn't in by then are left as they are,
+        while fetches already running finish in the background and fill
+        the cache.
         
-        # Get price from price li
-        price_elem = card.select_one('.job-post-tags li.price i')
-        price = price_elem.get_text(strip=True) if price_elem else ""
+        Returns:
+            Number of jobs enriched
+        """
+        enriched = 0
+        missing = []
+        for job in jobs:
+            details = cache.get(job['id'])
+            if details is None:
+                missing.append(job)
+            else:
+                # Pages cached by older versions may hold fields no longer extracted
+                job.update((key, details[key]) for key in DETAIL_FIELDS if key in details)
+                enriched += 1
+        
+        if not missing:
+            return enriched
+        
+        pool = ThreadPoolExecutor(max_workers=min(max_workers, len(missing)), thread_name_prefix="job-details")
+        futures = {pool.submit(self._fetch_details, job, cache): job for job in missing}
+        done, _ = wait(futures, timeout=timeout)
+        pool.shutdown(wait=False, cancel_futures=True)
+        
+        for future in done:
+            details = future.result()
+            if details is not None:
+                futures[future].update(details)
+                enriched += 1
+        
+        if len(done) < len(missing):
+            logger.info(f"Details of {len(missing) - len(done)} jobs not fetched within {timeout}s, sending without")
+        return enriched
+    
+    def _fetch_details(self, job: Dict, cache: DetailCache) -> Optional[Dict]:
+        try:
+            response = self._fetch(job['url'], category='job-details')
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Failed to fetch details of job {job['id']}: {e}")
+            return None
         
-        # Get time posted from time li
-        time_elem = card.select_one('.job-post-tags li.time i')
-        time_posted = time_elem.get_text(strip=True) if time_elem else ""
+        details = parse_job_details(response.text)
+        cache.put(job['id'], details)
+        return details
+    
+    def scrape_all_categories(self, category_slugs: List[str], known_ids=None,
+                              high_water: Optional[Dict[str, int]] = None, max_pages: int = 1,
+                              max_age: Optional[float] = None) -> List[Dict]:
+        """
+        Scrape jobs from multiple categories, up to max_workers at a time
         
-        # Get location from address span (more accurate than data attribute)
-        address_elem = card.select_one('.address')
-        if address_elem:
-            location = address_elem.get_text(strip=True)
-        
-        job = {
-            'id': job_id,  # Use the actual job ID from the site
-            'title': title,
-            'description': description,
-            'category': category_name,
-            'subcategory': subcategory,
-            'price': price if price and price != 'Nav norādīts' else 'Nav norādīts',
-            'location': location or 'Nav norādīts',
-            'time_posted': time_posted,
-            'url': job_url,
-            'date_posted': date_posted,
-            'scraped_at': datetime.now().isoformat()
-        }
+        Args:
+            category_slugs: Categories to scrape
+            known_ids: Optional container of already seen job IDs (see scrape_jobs)
+            high_water: Optional per-category highest seen job ID; updated in
+                place with the IDs found in this run
+            max_pages: Max listing pages per category (see scrape_jobs)
+            max_age: Max age of cached listings to reuse (see scrape_jobs)
         
-        return job
+        Returns:
+            Jobs de-duplicated across categories; category_slugs lists every
+            category a job was found in, category_slug the first
+        """
+        jobs = []
+        for record, slugs in self.scrape_category_records(category_slugs, known_ids, high_water, max_pages, max_age):
+            job = record.to_dict()
+            job['category_slugs'] = slugs
+            jobs.append(job)
+        return jobs
     
-    def scrape_all_categories(self, category_slugs: List[str]) -> List[Dict]:
-        """Scrape jobs from multiple categories"""
-        all_jobs = []
-        seen_ids = set()
+    def scrape_category_records(self, category_slugs: List[str], known_ids=None,
+                                high_water: Optional[Dict[str, int]] = None, max_pages: int = 1,
+                                max_age: Optional[float] = None) -> List[Tuple[Job, List[str]]]:
+        """
+        Scrape multiple categories as Job records (see scrape_all_categories)
         
+        Returns:
+            (Job record, every category it was found in) of each job,
+            de-duplicated across categories; the records are shared with
+            the listing cache, as in scrape_job_records
+        """
+        slugs = []
         for slug in category_slugs:
             if slug not in self.CATEGORIES:
                 logger.warning(f"Unknown category: {slug}")
                 continue
+            slugs.append(slug)
+        
+        def scrape(slug):
+            mark = high_water.get(slug) if high_water is not None else None
+            return self.scrape_job_records(slug, known_ids, mark, max_pages, max_age)
+        
+        if self.max_workers > 1 and len(slugs) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(slugs))) as pool:
+                results = list(pool.map(scrape, slugs))
+        else:
+            results = [scrape(slug) for slug in slugs]
+        
+        # Merge in category order so de-duplication stays deterministic
+        all_jobs = []
+        found_in = {}
+        for slug, jobs in zip(slugs, results):
+            if high_water is not None:
+                numeric_ids = [int(job['id']) for job in jobs if job['id'].isdigit()]
+                if numeric_ids:
+                    high_water[slug] = max(numeric_ids + [high_water.get(slug, 0)])
             
-            jobs = self.scrape_jobs(slug)
             for job in jobs:
-                if job['id'] not in seen_ids:
-                    all_jobs.append(job)
-                    seen_ids.add(job['id'])
-            
-            # Small delay between requests
-            time.sleep(1)
+                job_slugs = found_in.get(job['id'])
+                if job_slugs is None:
+                    found_in[job['id']] = [slug]
+                    all_jobs.append((job, found_in[job['id']]))
+                elif slug not in job_slugs:
+                    job_slugs.append(slug)
         
         return all_jobs
 
@@ -267,97 +1307,138 @@ class GetaProScraper:
 class TelegramBot:
     """Telegram bot with command handling and notifications"""
     
-    def __init__(self, bot_token: str, chat_id: str):
+    MAX_MESSAGE_LENGTH = 4096
+    
+    def __init__(self, bot_token: str, chat_id: str, subscriptions: 'SubscriptionManager' = None,
+                 scraper: GetaProScraper = None, archive: 'JobArchive' = None,
+                 scheduler: 'PollScheduler' = None):
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.api_url = f"https://api.telegram.org/bot{bot_token}"
+        self.api = TelegramApiClient(bot_token)
+        self.subscriptions = subscriptions
+        # Shared with the monitor so /latest reads its listing cache
+        self.scraper = scraper
+        self.archive = archive
+        # Tells /status and /interval how often categories are really polled
+        self.scheduler = scheduler
         self.last_update_id = 0
     
-    def send_message(self, text: str, parse_mode: str = "HTML", chat_id: str = None) -> bool:
+    @property
+    def api_url(self) -> str:
+        return self.api.api_url
+    
+    @api_url.setter
+    def api_url(self, url: str):
+        self.api.api_url = url
+    
+    def send_message(self, text: str, parse_mode: str = "HTML", chat_id: str = None) -> bool:
         """Send a message via Telegram"""
-        url = f"{self.api_url}/sendMessage"
-        payload = {
-            'chat_id': chat_id or self.chat_id,
-            'text': text,
-            'parse_mode': parse_mode,
-            'disable_web_page_preview': True
-        }
-        
         try:
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
+            self.api.send_message(chat_id or self.chat_id, text, parse_mode=parse_mode)
             return True
-        except requests.RequestException as e:
+        except (TelegramApiError, requests.RequestException) as e:
             logger.error(f"Failed to send Telegram message: {e}")
             return False
     
-    def get_updates(self) -> List[Dict]:
-        """Get new messages/commands from Telegram"""
-        url = f"{self.api_url}/getUpdates"
-        params = {
-            'offset': self.last_update_id + 1,
-            'timeout': 1
-        }
-        
+    def get_updates(self, timeout: int = 1) -> List[Dict]:
+        """Get new messages/commands from Telegram (long-polls up to timeout seconds)"""
         try:
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if data.get('ok') and data.get('result'):
-                updates = data['result']
-                if updates:
-                    self.last_update_id = updates[-1]['update_id']
+            updates = self.api.get_updates(offset=self.last_update_id + 1, timeout=timeout)
+            if updates:
+                self.last_update_id = updates[-1]['update_id']
                 return updates
         except Exception as e:
             logger.debug(f"Error getting updates: {e}")
         
         return []
     
+    def set_webhook(self, url: str, secret_token: str = "") -> bool:
+        """Register a webhook URL; Telegram then stops serving getUpdates"""
+        try:
+            self.api.set_webhook(url, secret_token, allowed_updates=['message'])
+            return True
+        except (TelegramApiError, requests.RequestException) as e:
+            logger.error(f"Failed to set webhook: {e}")
+            return False
+    
+    def delete_webhook(self) -> bool:
+        """Remove any registered webhook so getUpdates works again"""
+        try:
+            self.api.delete_webhook()
+            return True
+        except (TelegramApiError, requests.RequestException) as e:
+            logger.error(f"Failed to delete webhook: {e}")
+            return False
+    
     def process_commands(self, config_manager) -> None:
         """Check for and process any pending commands"""
-        updates = self.get_updates()
+        for update in self.get_updates():
+            self.handle_update(update, config_manager)
+    
+    def _subscriptions(self, config_manager) -> 'SubscriptionManager':
+        if self.subscriptions is None:
+            self.subscriptions = SubscriptionManager(config_manager)
+        return self.subscriptions
+    
+    def handle_update(self, update: Dict, config_manager) -> None:
+        """Process a single Telegram update"""
+        if 'message' not in update:
+            return
         
-        for update in updates:
-            if 'message' not in update:
-                continue
-            
-            message = update['message']
-            chat_id = str(message['chat']['id'])
-            
-            # Only respond to authorized user
-            if chat_id != self.chat_id:
-                continue
-            
-            text = message.get('text', '')
-            if not text.startswith('/'):
-                continue
-            
-            # Parse command
-            parts = text.split(maxsplit=1)
-            command = parts[0].lower().split('@')[0]  # Handle @botname suffix
-            args = parts[1] if len(parts) > 1 else ""
-            
-            # Handle commands
-            if command == '/start' or command == '/help':
-                self._cmd_help(chat_id)
-            elif command == '/status':
-                self._cmd_status(chat_id, config_manager)
-            elif command == '/categories':
-                self._cmd_categories(chat_id, config_manager)
-            elif command == '/list':
-                self._cmd_list(chat_id)
-            elif command == '/add':
-                self._cmd_add(chat_id, args, config_manager)
-            elif command == '/remove':
-                self._cmd_remove(chat_id, args, config_manager)
-            elif command == '/check':
-                self._cmd_check(chat_id)
-            elif command == '/latest':
-                self._cmd_latest(chat_id, config_manager)
-            elif command == '/interval':
-                self._cmd_interval(chat_id, args, config_manager)
-    
-    def _cmd_help(self, chat_id: str):
+        message = update['message']
+        chat_id = str(message['chat']['id'])
+        subscriptions = self._subscriptions(config_manager)
+        
+        # Only respond to the owner and allowed subscribers
+        if not subscriptions.is_allowed(chat_id):
+            return
+        
+        text = message.get('text', '')
+        if not text.startswith('/'):
+            return
+        
+        # Parse command
+        parts = text.split(maxsplit=1)
+        command = parts[0].lower().split('@')[0]  # Handle @botname suffix
+        args = parts[1] if len(parts) > 1 else ""
+        is_owner = subscriptions.is_owner(chat_id)
+        
+        # Handle commands
+        if command == '/start' or command == '/help':
+            if subscriptions.get(chat_id) is None:
+                subscriptions.save(chat_id, {'categories': []})
+            self._cmd_help(chat_id, is_owner)
+        elif command == '/stop':
+            self._cmd_stop(chat_id, config_manager)
+        elif command == '/status':
+            self._cmd_status(chat_id, config_manager)
+        elif command == '/categories':
+            self._cmd_categories(chat_id, config_manager)
+        elif command == '/list':
+            self._cmd_list(chat_id)
+        elif command == '/add':
+            self._cmd_add(chat_id, args, config_manager)
+        elif command == '/remove':
+            self._cmd_remove(chat_id, args, config_manager)
+        elif command == '/latest':
+            self._cmd_latest(chat_id, config_manager)
+        elif command == '/filter':
+            self._cmd_filter(chat_id, args, config_manager)
+        elif command == '/search':
+            self._cmd_search(chat_id, args)
+        elif command == '/price':
+            self._cmd_price(chat_id, args, config_manager)
+        elif not is_owner:
+            return
+        # Commands below affect the whole bot, so only the owner may use them
+        elif command == '/check':
+            self._cmd_check(chat_id)
+        elif command == '/interval':
+            self._cmd_interval(chat_id, args, config_manager)
+        elif command == '/profile':
+            self._cmd_profile(chat_id, args)
+    
+    def _cmd_help(self, chat_id: str, is_owner: bool = True):
         """Show help message"""
         help_text = """🤖 <b>GetaPro Job Monitor</b>
 
@@ -368,32 +1449,106 @@ class TelegramBot:
 /add [kategorija] - Pievienot kategoriju
 /remove [kategorija] - Noņemt kategoriju
 /latest - Rādīt 10 jaunākos darbus
+/filter - Atslēgvārdu filtri
+/price [min] [max] - Cenas filtrs
+/search [vārdi] - Meklēt arhīvā"""
+        if is_owner:
+            help_text += """
 /interval [min] - Mainīt pārbaudes intervālu
 /check - Pārbaudīt jaunus darbus tagad
+/profile [cpu|memory] [N] - Profilēt nākamās N pārbaudes"""
+        else:
+            help_text += """
+/stop - Atteikties no paziņojumiem"""
+        help_text += """
 /help - Rādīt šo palīdzību"""
         self.send_message(help_text, chat_id=chat_id)
     
+    def _chat_categories(self, chat_id: str, config_manager) -> List[str]:
+        settings = self._subscriptions(config_manager).get(chat_id) or {}
+        return settings.get('categories', [])
+    
+    def _save_chat_categories(self, chat_id: str, categories: List[str], config_manager):
+        subscriptions = self._subscriptions(config_manager)
+        settings = subscriptions.get(chat_id) or {}
+        settings['categories'] = categories
+        subscriptions.save(chat_id, settings)
+    
+    def _cmd_stop(self, chat_id: str, config_manager):
+        """Unsubscribe a chat"""
+        self._subscriptions(config_manager).remove(chat_id)
+        self.send_message("👋 Paziņojumi atslēgti.\n\nIzmanto /start lai atsāktu.", chat_id=chat_id)
+    
     def _cmd_status(self, chat_id: str, config_manager):
         """Show bot status"""
         config = config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        categories = self._chat_categories(chat_id, config_manager)
         interval = config.get('check_interval_minutes', 10)
         
         status = f"""✅ <b>Bots darbojas!</b>
 
-⏰ Pārbaudes intervāls: {interval} min
+⏰ Pārbaudes intervāls: {interval} min{self._interval_in_effect()}
 📁 Aktīvās kategorijas: {len(categories)}
 """
         for cat in categories:
             cat_name = GetaProScraper.CATEGORIES.get(cat, {}).get('name', cat)
             status += f"\n  • {cat_name}"
         
+        subscriptions = self._subscriptions(config_manager)
+        if subscriptions.is_owner(chat_id):
+            status += f"\n\n👥 Abonenti: {len(subscriptions.all())}"
+            status += f"\n🌐 Uzraudzītās kategorijas: {len(subscriptions.index())}"
+            status += self._connection_status()
+            status += self._metrics_summary()
+        
         self.send_message(status, chat_id=chat_id)
     
+    @staticmethod
+    def _metrics_summary() -> str:
+        """Cycle, fetch and delivery metrics for /status"""
+        if not CYCLE_SECONDS.count():
+            return ""
+        
+        def seconds(value):
+            return f"{value:.2f} s" if value is not None else "—"
+        
+        sent = SEND_SECONDS.count(outcome='ok')
+        failed = SEND_SECONDS.count() - sent
+        summary = "\n\n📊 <b>Metrikas</b> (kopš starta)"
+        summary += (f"\n🔁 Pārbaudes: {CYCLE_SECONDS.count()}, vid. {seconds(CYCLE_SECONDS.mean())}, "
+                    f"p95 {seconds(CYCLE_SECONDS.quantile(0.95))}")
+        summary += (f"\n🌐 Pieprasījumi: {FETCH_SECONDS.count()}, vid. {seconds(FETCH_SECONDS.mean())}, "
+                    f"{FETCH_BYTES.value() / 1048576:.1f} MB")
+        summary += f"\n🧩 Parsēšana: vid. {seconds(PARSE_SECONDS.mean())}"
+        summary += f"\n🆕 Jauni darbi: {JOBS_NEW.value():.0f} no {JOBS_SCRAPED.value():.0f}"
+        summary += f"\n✉️ Nosūtīti: {sent}, neizdevās: {failed}, gaida: {OUTBOX_PENDING.value():.0f}"
+        if NOTIFY_DELAY.count():
+            summary += f"\n⏱ Piegāde: vid. {seconds(NOTIFY_DELAY.mean())}"
+        return summary
+    
+    def _connection_status(self) -> str:
+        """Circuit breaker summary for /status"""
+        if self.scraper is None:
+            return ""
+        
+        labels = {CircuitBreaker.OPEN: "atslēgts", CircuitBreaker.HALF_OPEN: "pārbauda"}
+        problems = [
+            (name, breaker) for name, breaker in self.scraper.circuit_breakers()
+            if breaker.state != CircuitBreaker.CLOSED
+        ]
+        if not problems:
+            return "\n🔌 Savienojums ar getapro.lv: OK"
+        
+        status = "\n🔌 Savienojuma problēmas:"
+        for name, breaker in problems:
+            status += f"\n  ⚠️ {name}: {labels[breaker.state]}"
+            if breaker.state == CircuitBreaker.OPEN:
+                status += f" (mēģinās pēc {breaker.retry_in():.0f} s)"
+        return status
+    
     def _cmd_categories(self, chat_id: str, config_manager):
         """Show active categories"""
-        config = config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        categories = self._chat_categories(chat_id, config_manager)
         
         if not categories:
             self.send_message("❌ Nav aktīvu kategoriju!\n\nIzmanto /add lai pievienotu.", chat_id=chat_id)
@@ -426,11 +1581,10 @@ class TelegramBot:
             return
         
         if category not in GetaProScraper.CATEGORIES:
-            self.send_message(f"❌ Nezināma kategorija: <code>{category}</code>\n\nIzmanto /list lai redzētu pieejamās.", chat_id=chat_id)
+            self.send_message(f"❌ Nezināma kategorija: <code>{html.escape(category)}</code>\n\nIzmanto /list lai redzētu pieejamās.", chat_id=chat_id)
             return
         
-        config = config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        categories = self._chat_categories(chat_id, config_manager)
         
         if category in categories:
             cat_name = GetaProScraper.CATEGORIES[category]['name']
@@ -438,8 +1592,7 @@ class TelegramBot:
             return
         
         categories.append(category)
-        config['enabled_categories'] = categories
-        config_manager.save_config(config)
+        self._save_chat_categories(chat_id, categories, config_manager)
         
         cat_name = GetaProScraper.CATEGORIES[category]['name']
         self.send_message(f"✅ Kategorija pievienota!\n\n<b>{cat_name}</b>", chat_id=chat_id)
@@ -452,20 +1605,131 @@ class TelegramBot:
             self.send_message("❌ Norādi kategoriju!\n\nPiemērs: /remove foto-video-audio\n\nIzmanto /categories lai redzētu aktīvās.", chat_id=chat_id)
             return
         
-        config = config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        categories = self._chat_categories(chat_id, config_manager)
         
         if category not in categories:
-            self.send_message(f"❌ Kategorija nav aktīva: <code>{category}</code>\n\nIzmanto /categories lai redzētu aktīvās.", chat_id=chat_id)
+            self.send_message(f"❌ Kategorija nav aktīva: <code>{html.escape(category)}</code>\n\nIzmanto /categories lai redzētu aktīvās.", chat_id=chat_id)
             return
         
         categories.remove(category)
-        config['enabled_categories'] = categories
-        config_manager.save_config(config)
+        self._save_chat_categories(chat_id, categories, config_manager)
         
         cat_name = GetaProScraper.CATEGORIES.get(category, {}).get('name', category)
         self.send_message(f"✅ Kategorija noņemta!\n\n<b>{cat_name}</b>", chat_id=chat_id)
     
+    def _cmd_filter(self, chat_id: str, args: str, config_manager):
+        """Show or change keyword filters"""
+        subscriptions = self._subscriptions(config_manager)
+        settings = subscriptions.get(chat_id) or {'categories': []}
+        filters = settings.get('filters') or {}
+        include = filters.get('include', [])
+        exclude = filters.get('exclude', [])
+        args = args.strip()
+        
+        if not args:
+            msg = "🔎 <b>Filtri</b>\n"
+            msg += "\n✅ Rādīt tikai ar: " + (", ".join(f"<code>{html.escape(f)}</code>" for f in include) or "—")
+            msg += "\n🚫 Izlaist ar: " + (", ".join(f"<code>{html.escape(f)}</code>" for f in exclude) or "—")
+            msg += """
+
+<b>Lietošana:</b>
+/filter +vārds - Rādīt tikai darbus ar šo vārdu
+/filter -vārds - Izlaist darbus ar šo vārdu
+/filter +/regex/ - Regulārā izteiksme
+/filter del vārds - Dzēst filtru
+/filter clear - Dzēst visus filtrus
+
+Meklē nosaukumā, aprakstā un apakškategorijā."""
+            self.send_message(msg, chat_id=chat_id)
+            return
+        
+        if args == 'clear':
+            include, exclude = [], []
+            reply = "✅ Visi filtri dzēsti"
+        elif args.startswith('del '):
+            entry = args[4:].strip()
+            if entry not in include and entry not in exclude:
+                self.send_message(f"❌ Filtrs nav atrasts: <code>{html.escape(entry)}</code>", chat_id=chat_id)
+                return
+            include = [f for f in include if f != entry]
+            exclude = [f for f in exclude if f != entry]
+            reply = f"✅ Filtrs dzēsts: <code>{html.escape(entry)}</code>"
+        elif args[0] in '+-' and args[1:].strip():
+            entry = args[1:].strip()
+            kind, pattern = parse_filter(entry)
+            if kind == 'regex':
+                try:
+                    compile_filter_regex(pattern)
+                except re.error as e:
+                    self.send_message(f"❌ Nederīga regulārā izteiksme: {html.escape(str(e))}", chat_id=chat_id)
+                    return
+            
+            target = include if args[0] == '+' else exclude
+            if entry not in target:
+                target.append(entry)
+            reply = f"✅ Filtrs pievienots: <code>{html.escape(entry)}</code>"
+        else:
+            self.send_message("❌ Nesaprotu!\n\nPiemērs: /filter +flīzēšana", chat_id=chat_id)
+            return
+        
+        settings['filters'] = {'include': include, 'exclude': exclude}
+        if not include and not exclude:
+            settings.pop('filters')
+        subscriptions.save(chat_id, settings)
+        self.send_message(reply, chat_id=chat_id)
+    
+    @staticmethod
+    def _format_price_range(low: Optional[float], high: Optional[float]) -> str:
+        if low is not None and high is not None:
+            return f"{low:g}–{high:g} €"
+        if low is not None:
+            return f"no {low:g} €"
+        return f"līdz {high:g} €"
+    
+    def _cmd_price(self, chat_id: str, args: str, config_manager):
+        """Show or change the price range filter"""
+        subscriptions = self._subscriptions(config_manager)
+        settings = subscriptions.get(chat_id) or {'categories': []}
+        price_range = settings.get('price_range')
+        parts = args.split()
+        
+        if not parts:
+            current = self._format_price_range(price_range.get('min'), price_range.get('max')) if price_range else "—"
+            msg = f"""💶 <b>Cenas filtrs:</b> {current}
+
+<b>Lietošana:</b>
+/price 100 - Tikai darbi no 100 €
+/price 100 500 - Tikai darbi no 100 līdz 500 €
+/price - 500 - Tikai darbi līdz 500 €
+/price clear - Dzēst cenas filtru
+
+Darbi bez norādītas cenas tiek rādīti vienmēr."""
+            self.send_message(msg, chat_id=chat_id)
+            return
+        
+        if parts == ['clear']:
+            settings.pop('price_range', None)
+            subscriptions.save(chat_id, settings)
+            self.send_message("✅ Cenas filtrs dzēsts", chat_id=chat_id)
+            return
+        
+        try:
+            bounds = [None if part == '-' else float(part.replace(',', '.')) for part in parts]
+        except ValueError:
+            bounds = []
+        if len(bounds) == 1:
+            bounds.append(None)
+        if any(bound is not None and not (math.isfinite(bound) and bound >= 0) for bound in bounds):
+            self.send_message("❌ Cenai jābūt skaitlim, kas nav mazāks par 0\n\nPiemērs: /price 100 500", chat_id=chat_id)
+            return
+        if len(bounds) != 2 or bounds == [None, None] or (None not in bounds and bounds[0] > bounds[1]):
+            self.send_message("❌ Nesaprotu!\n\nPiemērs: /price 100 500", chat_id=chat_id)
+            return
+        
+        settings['price_range'] = {'min': bounds[0], 'max': bounds[1]}
+        subscriptions.save(chat_id, settings)
+        self.send_message(f"✅ Cenas filtrs: {self._format_price_range(*bounds)}", chat_id=chat_id)
+    
     def _cmd_check(self, chat_id: str):
         """Trigger a check (handled by main loop)"""
         self.send_message("🔍 Pārbaudu jaunus darbus...", chat_id=chat_id)
@@ -476,22 +1740,23 @@ class TelegramBot:
         """Show 10 latest jobs"""
         self.send_message("🔍 Meklēju jaunākos darbus...", chat_id=chat_id)
         
-        config = config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        categories = self._chat_categories(chat_id, config_manager)
         
         if not categories:
             self.send_message("❌ Nav aktīvu kategoriju!\n\nIzmanto /add lai pievienotu.", chat_id=chat_id)
             return
         
-        scraper = GetaProScraper()
+        if self.scraper is None:
+            self.scraper = GetaProScraper()
         all_jobs = []
         
         # Scrape from enabled categories (limit to avoid too many messages)
         for cat in categories[:3]:  # Max 3 categories
             try:
-                jobs = scraper.scrape_jobs(cat)
+                jobs = self.scraper.scrape_jobs(cat)
+                if self.archive is not None:
+                    self.archive.add(jobs)
                 all_jobs.extend(jobs[:5])  # Max 5 per category
-                time.sleep(0.5)  # Small delay
             except Exception as e:
                 logger.error(f"Error scraping {cat}: {e}")
         
@@ -500,21 +1765,56 @@ class TelegramBot:
             return
         
         # Send first 10 jobs
+        escape = self._escape
         for job in all_jobs[:10]:
-            msg = f"📋 <b>{job['title']}</b>\n"
-            msg += f"📁 {job['category']}\n"
+            msg = f"📋 <b>{escape(job['title'])}</b>\n"
+            msg += f"📁 {escape(job['category'])}\n"
             if job.get('subcategory'):
-                msg += f"📂 {job['subcategory']}\n"
-            msg += f"💰 {job.get('price', 'Nav norādīts')}\n"
-            msg += f"📍 {job.get('location', 'Nav norādīts')}\n"
-            msg += f"⏰ {job.get('time_posted', '')}\n"
+                msg += f"📂 {escape(job['subcategory'])}\n"
+            msg += f"💰 {escape(job.get('price', 'Nav norādīts'))}\n"
+            msg += f"📍 {escape(job.get('location', 'Nav norādīts'))}\n"
+            msg += f"⏰ {escape(job.get('time_posted', ''))}\n"
             if job.get('description'):
-                desc = job['description'][:150]
+                desc = escape(job['description'][:150])
                 msg += f"\n📝 {desc}{'...' if len(job['description']) > 150 else ''}\n"
-            msg += f"\n🔗 <a href=\"{job.get('url', 'https://getapro.lv/job')}\">Skatīt pasūtījumu</a>"
+            msg += f"\n🔗 <a href=\"{html.escape(job.get('url', 'https://getapro.lv/job'))}\">Skatīt pasūtījumu</a>"
             self.send_message(msg, chat_id=chat_id)
             time.sleep(0.3)  # Small delay between messages
     
+    def _cmd_search(self, chat_id: str, query: str):
+        """Search archived jobs"""
+        if self.archive is None:
+            self.send_message("❌ Darbu arhīvs ir izslēgts", chat_id=chat_id)
+            return
+        
+        query = query.strip()
+        if not query:
+            self.send_message("❌ Norādi, ko meklēt!\n\nPiemērs: /search flīzēšana vannas", chat_id=chat_id)
+            return
+        
+        jobs = self.archive.search(query, limit=10)
+        if not jobs:
+            self.send_message(f"❌ Nekas nav atrasts: <code>{html.escape(query)}</code>", chat_id=chat_id)
+            return
+        
+        entries = []
+        for number, job in enumerate(jobs, 1):
+            archived = datetime.fromtimestamp(job['archived_at']).strftime('%d.%m.%Y')
+            entries.append(f"{number}. {self.format_job_digest_entry(job)} · {archived}")
+        msg = f"🔎 <b>Atrasti darbi: {len(jobs)}</b> (<code>{html.escape(query)}</code>)\n\n" + "\n\n".join(entries)
+        self.send_message(msg, chat_id=chat_id)
+    
+    def _interval_in_effect(self) -> str:
+        """The poll intervals the monitor actually uses, when they differ from the configured one"""
+        if self.scheduler is None or not self.scheduler.adaptive:
+            return ""
+        shortest, longest = (round(seconds / 60, 1) for seconds in self.scheduler.interval_range())
+        if shortest == longest == round(self.scheduler.max_interval / 60, 1):
+            return ""
+        if shortest == longest:
+            return f" (faktiski {longest:g} min)"
+        return f" (faktiski {shortest:g}–{longest:g} min)"
+    
     def _cmd_interval(self, chat_id: str, minutes: str, config_manager):
         """Change check interval"""
         if not minutes.strip():
@@ -522,7 +1822,7 @@ class TelegramBot:
             config = config_manager.get_config()
             current = config.get('check_interval_minutes', 10)
             self.send_message(
-                f"⏰ Pašreizējais intervāls: <b>{current} min</b>\n\n"
+                f"⏰ Pašreizējais intervāls: <b>{current} min</b>{self._interval_in_effect()}\n\n"
                 f"Lai mainītu: /interval 5\n"
                 f"(Min: 1, Max: 60 minūtes)",
                 chat_id=chat_id
@@ -540,37 +1840,120 @@ class TelegramBot:
             config_manager.save_config(config)
             
             self.send_message(
-                f"✅ Intervāls nomainīts uz <b>{mins} min</b>\n\n"
-                f"⚠️ Restartē botu lai izmaiņas stātos spēkā",
+                f"✅ Intervāls nomainīts uz <b>{mins} min</b>{self._interval_in_effect()}\n\n"
+                f"Izmaiņas stājas spēkā uzreiz",
                 chat_id=chat_id
             )
         except ValueError:
             self.send_message("❌ Norādi minūtes!\n\nPiemērs: /interval 5", chat_id=chat_id)
     
+    def _cmd_profile(self, chat_id: str, args: str):
+        """Profile the next check cycles (handled by main loop)"""
+        mode, cycles = 'cpu', 3
+        for arg in args.split():
+            if arg in CycleProfiler.MODES:
+                mode = arg
+            elif arg.isdigit() and 1 <= int(arg) <= 20:
+                cycles = int(arg)
+            else:
+                self.send_message("❌ Nesaprotu!\n\nPiemērs: /profile cpu 3 vai /profile memory 5", chat_id=chat_id)
+                return
+        
+        self._profile_request = (mode, cycles, chat_id)
+        self.send_message(
+            f"🔬 Profilēšu nākamās {cycles} pārbaudes ({mode}).\nRezultātu atsūtīšu, kad būs gatavs.",
+            chat_id=chat_id
+        )
+    
+    def take_profile_request(self) -> Optional[Tuple[str, int, str]]:
+        """(mode, cycles, chat ID) of a pending /profile, if any"""
+        request = getattr(self, '_profile_request', None)
+        self._profile_request = None
+        return request
+    
     def should_force_check(self) -> bool:
         """Check if user requested immediate check"""
         result = getattr(self, '_force_check', False)
         self._force_check = False
         return result
     
+    @staticmethod
+    def _escape(value) -> str:
+        """Scraped text made safe for parse_mode=HTML"""
+        return html.escape(str(value or ''), quote=False)
+    
     def format_job_message(self, job: Dict) -> str:
         """Format a job as a Telegram message"""
+        escape = self._escape
         message = f"""🆕 <b>Jauns pasūtījums!</b>
 
-📋 <b>{job['title']}</b>
-
-📁 Kategorija: {job['category']}
-{f"📂 Apakškategorija: {job['subcategory']}" if job.get('subcategory') else ""}
-💰 Cena: {job.get('price', 'Nav norādīts')}
-📍 Vieta: {job.get('location', 'Nav norādīts')}
-⏰ {job.get('time_posted', '')}
+📋 <b>{escape(job['title'])}</b>
 
-📝 {job['description'][:300]}{'...' if len(job.get('description', '')) > 300 else ''}
+📁 Kategorija: {escape(job['category'])}
+{f"📂 Apakškategorija: {escape(job['subcategory'])}" if job.get('subcategory') else ""}
+💰 Cena: {escape(job.get('price', 'Nav norādīts'))}
+📍 Vieta: {escape(job.get('location', 'Nav norādīts'))}
+⏰ {escape(job.get('time_posted', ''))}{self._format_job_details(job)}
 
-🔗 <a href="{job.get('url', 'https://getapro.lv/job')}">Skatīt pasūtījumu</a>"""
+🔗 <a href="{html.escape(job.get('url', 'https://getapro.lv/job'))}">Skatīt pasūtījumu</a>"""
         
         return message
     
+    def _format_job_details(self, job: Dict) -> str:
+        """Description line, with the detail page's text when fetched"""
+        if job.get('full_description'):
+            text, limit = job['full_description'], 1500
+        else:
+            text, limit = job.get('description', ''), 300
+        description = self._escape(text[:limit]) + ('...' if len(text) > limit else '')
+        return f"\n\n📝 {description}"
+    
+    def format_job_digest_entry(self, job: Dict) -> str:
+        """Format a job as one compact entry of a digest message"""
+        details = [job['category']]
+        if job.get('price') and job['price'] != 'Nav norādīts':
+            details.append(f"💰 {job['price']}")
+        if job.get('location') and job['location'] != 'Nav norādīts':
+            details.append(f"📍 {job['location']}")
+        
+        title = html.escape(job['title'][:200], quote=False)
+        url = html.escape(job.get('url', 'https://getapro.lv/job'))
+        
+        return f"""<a href="{url}"><b>{title}</b></a>
+{html.escape(' · '.join(details), quote=False)}"""
+    
+    def format_job_digest(self, jobs: List[Dict]) -> List[Tuple[str, int]]:
+        """
+        Pack jobs into as few messages as Telegram's length limit allows.
+        
+        Returns:
+            List of (message text, number of jobs in it), in job order
+        """
+        header_reserve = 64  # room for the "Jauni pasūtījumi: N" header
+        limit = self.MAX_MESSAGE_LENGTH - header_reserve
+        
+        parts = []
+        entries = []
+        length = 0
+        for job in jobs:
+            entry = self.format_job_digest_entry(job)
+            # Entry plus its "N. " prefix and the blank line separating entries
+            entry_length = len(entry) + 8
+            if entries and length + entry_length > limit:
+                parts.append(entries)
+                entries, length = [], 0
+            entries.append(entry)
+            length += entry_length
+        if entries:
+            parts.append(entries)
+        
+        messages = []
+        for entries in parts:
+            body = "\n\n".join(f"{number}. {entry}" for number, entry in enumerate(entries, 1))
+            messages.append((f"🆕 <b>Jauni pasūtījumi: {len(entries)}</b>\n\n{body}", len(entries)))
+        
+        return messages
+    
     def notify_new_job(self, job: Dict) -> bool:
         """Send notification for a new job"""
         message = self.format_job_message(job)
@@ -581,86 +1964,1667 @@ class TelegramBot:
 TelegramNotifier = TelegramBot
 
 
+class UpdateTransport(ABC):
+    """Delivers incoming Telegram updates to the monitor loop through a queue"""
+    
+    def __init__(self, bot: TelegramBot):
+        self.bot = bot
+        self.updates = queue.Queue()
+        self._stop = threading.Event()
+    
+    @abstractmethod
+    def start(self):
+        """Start receiving updates in the background"""
+    
+    def stop(self):
+        self._stop.set()
+    
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Wait up to timeout seconds for the next update"""
+        try:
+            return self.updates.get(timeout=max(0, timeout))
+        except queue.Empty:
+            return None
+
+
+class LongPollTransport(UpdateTransport):
+    """getUpdates long-polling on a background thread"""
+    
+    def __init__(self, bot: TelegramBot, poll_timeout: int = 50):
+        super().__init__(bot)
+        self.poll_timeout = poll_timeout
+        self._thread = None
+    
+    def start(self):
+        # getUpdates is refused while a webhook is registered
+        self.bot.delete_webhook()
+        self._thread = threading.Thread(target=self._run, name="telegram-long-poll", daemon=True)
+        self._thread.start()
+        logger.info(f"Long-polling Telegram updates (timeout: {self.poll_timeout}s)")
+    
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            updates = self.bot.get_updates(timeout=self.poll_timeout)
+            for update in updates:
+                self.updates.put(update)
+            
+            # get_updates swallows errors; don't spin if it returned at once
+            if not updates and time.monotonic() - started < 1:
+                self._stop.wait(5)
+
+
+class WebhookTransport(UpdateTransport):
+    """
+    Receives updates pushed by Telegram on a small local HTTP server.
+    
+    Only POSTs to the webhook URL's path carrying the secret token are
+    accepted. Without a configured secret a random one is generated for
+    this run and registered with setWebhook, so updates (and owner
+    commands) can't be forged by anyone who can reach the port.
+    """
+    
+    def __init__(self, bot: TelegramBot, url: str, port: int = 8080, secret_token: str = ""):
+        super().__init__(bot)
+        self.url = url
+        self.path = urlparse(url).path or '/'
+        self.port = port
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self._server = None
+    
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        transport = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if urlparse(self.path).path != transport.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                token = self.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+                if not hmac.compare_digest(token.encode(), transport.secret_token.encode()):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    transport.updates.put(json.loads(self.rfile.read(length)))
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                
+                self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                logger.debug(f"Webhook: {format % args}")
+        
+        self._server = ThreadingHTTPServer(('0.0.0.0', self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="telegram-webhook", daemon=True).start()
+        self.bot.set_webhook(self.url, self.secret_token)
+        logger.info(f"Receiving Telegram updates via webhook on port {self.port}")
+    
+    def stop(self):
+        super().stop()
+        if self._server:
+            self._server.shutdown()
+            self.bot.delete_webhook()
+
+
+def create_update_transport(bot: TelegramBot, config: Dict) -> UpdateTransport:
+    """Pick the update transport configured in config.json"""
+    transport = config.get('telegram_transport', 'webhook' if config.get('webhook_url') else 'long_poll')
+    
+    if transport == 'webhook':
+        if not config.get('webhook_url'):
+            logger.error("telegram_transport is 'webhook' but webhook_url is missing, using long polling")
+        else:
+            return WebhookTransport(
+                bot,
+                config['webhook_url'],
+                port=int(config.get('webhook_port', 8080)),
+                secret_token=config.get('webhook_secret', '')
+            )
+    
+    return LongPollTransport(bot, poll_timeout=config.get('long_poll_timeout', 50))
+
+
 class ConfigManager:
-    """Manages configuration loading and saving"""
+    """
+    Manages configuration loading and saving.
     
-    def __init__(self):
+    config.json is only re-parsed when its mtime changes. Listeners added with
+    subscribe() are called as listener(old_config, new_config) whenever the
+    config changes, either through save_config() or an edit of the file.
+    With watch=False the file is read once and never checked again (for
+    short one-shot runs).
+    """
+    
+    def __init__(self, watch: bool = True):
         self._config = None
+        self._mtime = None
+        self._watch = watch
+        self._listeners = []
+        self._lock = threading.RLock()
+        # The environment cannot change while the process runs
+        self._env = self._read_env()
         self._load()
     
+    @staticmethod
+    def _read_env() -> Dict:
+        """Read config overrides from environment variables"""
+        env = {}
+        if os.environ.get('TELEGRAM_BOT_TOKEN'):
+            env['telegram_bot_token'] = os.environ['TELEGRAM_BOT_TOKEN']
+        if os.environ.get('TELEGRAM_CHAT_ID'):
+            env['telegram_chat_id'] = os.environ['TELEGRAM_CHAT_ID']
+        if os.environ.get('CHECK_INTERVAL_MINUTES'):
+            env['check_interval_minutes'] = int(os.environ['CHECK_INTERVAL_MINUTES'])
+        if os.environ.get('ENABLED_CATEGORIES'):
+            env['enabled_categories'] = os.environ['ENABLED_CATEGORIES'].split(',')
+        if os.environ.get('WEBHOOK_URL'):
+            env['webhook_url'] = os.environ['WEBHOOK_URL']
+        if os.environ.get('WEBHOOK_SECRET'):
+            env['webhook_secret'] = os.environ['WEBHOOK_SECRET']
+        if os.environ.get('PORT'):
+            env['webhook_port'] = int(os.environ['PORT'])
+        return env
+    
+    @staticmethod
+    def _file_mtime() -> Optional[int]:
+        try:
+            return CONFIG_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
     def _load(self):
         """Load configuration from file and environment variables"""
         config = {}
+        mtime = self._file_mtime()
         
         # Load from file if exists
-        if CONFIG_FILE.exists():
+        if mtime is not None:
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 config = json.load(f)
         
         # Environment variables override file config (for cloud deployment)
-        if os.environ.get('TELEGRAM_BOT_TOKEN'):
-            config['telegram_bot_token'] = os.environ['TELEGRAM_BOT_TOKEN']
-        if os.environ.get('TELEGRAM_CHAT_ID'):
-            config['telegram_chat_id'] = os.environ['TELEGRAM_CHAT_ID']
-        if os.environ.get('CHECK_INTERVAL_MINUTES'):
-            config['check_interval_minutes'] = int(os.environ['CHECK_INTERVAL_MINUTES'])
-        if os.environ.get('ENABLED_CATEGORIES'):
-            config['enabled_categories'] = os.environ['ENABLED_CATEGORIES'].split(',')
+        config.update(copy.deepcopy(self._env))
         
         self._config = config
+        self._mtime = mtime
+    
+    def subscribe(self, listener: Callable[[Dict, Dict], None]):
+        """Call listener(old_config, new_config) after every config change"""
+        self._listeners.append(listener)
+    
+    def _notify(self, old: Dict, new: Dict):
+        if old == new:
+            return
+        for listener in self._listeners:
+            try:
+                listener(copy.deepcopy(old), copy.deepcopy(new))
+            except Exception as e:
+                logger.error(f"Config listener failed: {e}")
+    
+    def reload_if_changed(self) -> bool:
+        """Re-read config.json if it changed on disk; returns True if it did"""
+        with self._lock:
+            if not self._watch or self._file_mtime() == self._mtime:
+                return False
+            
+            old = self._config
+            try:
+                self._load()
+            except (OSError, ValueError) as e:
+                # Half-written file: keep the previous config and retry later
+                logger.error(f"Failed to reload config: {e}")
+                return False
+            self._notify(old, self._config)
+            return True
     
     def get_config(self) -> Dict:
-        """Get current config (reloads from file)"""
-        self._load()
-        return self._config.copy()
+        """Get current config (reloads from file only if it changed)"""
+        with self._lock:
+            self.reload_if_changed()
+            return copy.deepcopy(self._config)
     
     def save_config(self, config: Dict):
         """Save config to file"""
-        # Keep internal fields
-        save_config = config.copy()
+        with self._lock:
+            # Keep internal fields
+            save_config = config.copy()
+            
+            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(save_config, f, indent=2, ensure_ascii=False)
+            
+            old = self._config
+            self._config = copy.deepcopy(config)
+            self._mtime = self._file_mtime()
+            self._notify(old, self._config)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton: finds every keyword in one pass over the text"""
+    
+    def __init__(self, keywords: Dict[str, List]):
+        """
+        Args:
+            keywords: Keyword -> payloads reported when the keyword occurs
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        
+        for keyword, payloads in keywords.items():
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].extend(payloads)
+        
+        # Breadth-first pass sets each node's fallback to its longest proper suffix
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, next_node in self._goto[node].items():
+                pending.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                self._out[next_node] = self._out[next_node] + self._out[self._fail[next_node]]
+    
+    def find(self, text: str) -> set:
+        """Payloads of all keywords occurring in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+def parse_filter(entry: str) -> Tuple[str, str]:
+    """Split a stored filter into ('regex', pattern) or ('keyword', text)"""
+    if len(entry) > 2 and entry.startswith('/') and entry.endswith('/'):
+        return 'regex', entry[1:-1]
+    return 'keyword', entry.casefold()
+
+
+# Regex filters come from any subscriber and run on the main loop, so keep them simple
+MAX_FILTER_REGEX_LENGTH = 200
+# A quantified group that itself ends in a quantifier, e.g. (a+)+ or (\w*x{2,})*
+NESTED_QUANTIFIER_RE = re.compile(r'\((?:[^()\\]|\\.)*(?:[+*]|\{[\d,]+\})\)(?:[+*]|\{[\d,]+\})')
+BACKREFERENCE_RE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+def compile_filter_regex(pattern: str) -> 're.Pattern':
+    """
+    Compile a regex filter (case-insensitive).
+    
+    Raises:
+        re.error: The pattern is invalid, longer than MAX_FILTER_REGEX_LENGTH,
+            or uses nested quantifiers or backreferences, which can
+            backtrack catastrophically
+    """
+    if len(pattern) > MAX_FILTER_REGEX_LENGTH:
+        raise re.error(f"pattern longer than {MAX_FILTER_REGEX_LENGTH} characters")
+    if NESTED_QUANTIFIER_RE.search(pattern):
+        raise re.error("nested quantifiers are not allowed")
+    if BACKREFERENCE_RE.search(pattern):
+        raise re.error("backreferences are not allowed")
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class FilterEngine:
+    """
+    Per-chat include/exclude filters over a job's title, description and
+    subcategory, compiled for all chats at once.
+    
+    Keywords (case-insensitive substrings) of every chat share one
+    Aho-Corasick automaton, so a job's text is scanned once however many
+    filters exist. Regex filters are compiled one by one, so flags and group
+    names of one can't clash with another. A chat receives a job if any
+    include filter matches (or it has none) and no exclude filter matches.
+    A chat's price range applies to jobs with a numeric price; jobs without
+    one always pass it. A chat whose filters can't be compiled is skipped
+    with a warning and gets every job, so it can't hold up the others.
+    """
+    
+    FIELDS = ('title', 'description', 'subcategory')
+    
+    def __init__(self, subscriptions: Dict[str, Dict]):
+        keywords = {}
+        regexes = {}
+        self._filtered = set()
+        self._has_include = set()
+        self._price_ranges = {}
+        
+        for chat_id, settings in subscriptions.items():
+            try:
+                self._add_chat(chat_id, settings, keywords, regexes)
+            except Exception as e:
+                logger.warning(f"Skipping the filters of chat {chat_id}: {e}")
         
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(save_config, f, indent=2, ensure_ascii=False)
+        self._keywords = KeywordMatcher(keywords) if keywords else None
+        self._regexes = regexes
+    
+    def _add_chat(self, chat_id: str, settings: Dict, keywords: Dict, regexes: Dict):
+        """Collect one chat's filters, adding them only once all of them could be read"""
+        chat_keywords = []
+        chat_regexes = {}
+        directions = set()
+        
+        price_range = settings.get('price_range')
+        if price_range:
+            price_range = tuple(
+                None if price_range.get(bound) is None else float(price_range[bound]) for bound in ('min', 'max')
+            )
         
-        self._config = config
+        filters = settings.get('filters') or {}
+        for direction in ('include', 'exclude'):
+            for entry in filters.get(direction, []):
+                kind, pattern = parse_filter(entry)
+                if kind == 'regex':
+                    try:
+                        regex = compile_filter_regex(pattern)
+                    except re.error as e:
+                        logger.warning(f"Skipping invalid filter {entry!r} of chat {chat_id}: {e}")
+                        continue
+                    chat_regexes.setdefault((chat_id, direction), []).append(regex)
+                elif pattern:
+                    chat_keywords.append((pattern, (chat_id, direction)))
+                else:
+                    continue
+                directions.add(direction)
+        
+        for pattern, key in chat_keywords:
+            keywords.setdefault(pattern, []).append(key)
+        regexes.update(chat_regexes)
+        if price_range:
+            self._price_ranges[chat_id] = price_range
+        if price_range or directions:
+            self._filtered.add(chat_id)
+        if 'include' in directions:
+            self._has_include.add(chat_id)
+    
+    def allowed_chats(self, job: Dict, chat_ids: List[str]) -> List[str]:
+        """The chats among chat_ids whose filters accept the job"""
+        if not self._filtered.intersection(chat_ids):
+            return list(chat_ids)
+        
+        text = '\n'.join(str(job.get(field) or '') for field in self.FIELDS)
+        hits = self._keywords.find(text.casefold()) if self._keywords else set()
+        
+        def matches(chat_id, direction):
+            if (chat_id, direction) in hits:
+                return True
+            return any(regex.search(text) for regex in self._regexes.get((chat_id, direction), ()))
+        
+        price = job.get('price_value')
+        
+        allowed = []
+        for chat_id in chat_ids:
+            if chat_id in self._filtered:
+                low, high = self._price_ranges.get(chat_id, (None, None))
+                if price is not None and ((low is not None and price < low) or (high is not None and price > high)):
+                    continue
+                if matches(chat_id, 'exclude'):
+                    continue
+                if chat_id in self._has_include and not matches(chat_id, 'include'):
+                    continue
+            allowed.append(chat_id)
+        return allowed
+
+
+class SubscriptionManager:
+    """
+    Per-chat subscriptions stored in config.json.
+    
+    The owner chat (telegram_chat_id) keeps using enabled_categories, so
+    existing configs and ENABLED_CATEGORIES work unchanged. Other chats live
+    under "subscriptions": {chat_id: {"categories": [...], ...settings}}.
+    Chats may subscribe if listed in allowed_chat_ids, or anyone may when
+    open_subscriptions is true.
+    """
+    
+    def __init__(self, config_manager: ConfigManager):
+        self.config_manager = config_manager
+        self._index = None
+        self._filters = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        config_manager.subscribe(self._on_config_change)
+    
+    def _on_config_change(self, old: Dict, new: Dict):
+        with self._lock:
+            self._index = None
+            self._filters = None
+            self._generation += 1
+    
+    @staticmethod
+    def _owner(config: Dict) -> str:
+        return str(config.get('telegram_chat_id', ''))
+    
+    def _all(self, config: Dict) -> Dict[str, Dict]:
+        subscriptions = {
+            str(chat_id): dict(settings)
+            for chat_id, settings in config.get('subscriptions', {}).items()
+        }
+        owner = self._owner(config)
+        settings = subscriptions.pop(owner, {})
+        settings['categories'] = config.get('enabled_categories', [])
+        # Owner first, so its categories keep their scrape order
+        return {owner: settings, **subscriptions}
+    
+    def all(self) -> Dict[str, Dict]:
+        """All subscriptions by chat ID"""
+        return self._all(self.config_manager.get_config())
+    
+    def get(self, chat_id: str) -> Optional[Dict]:
+        """Settings of one chat (with a 'categories' list), None if not subscribed"""
+        return self.all().get(chat_id)
+    
+    def is_owner(self, chat_id: str) -> bool:
+        return chat_id == self._owner(self.config_manager.get_config())
+    
+    def is_allowed(self, chat_id: str) -> bool:
+        """Whether a chat may use the bot"""
+        config = self.config_manager.get_config()
+        if chat_id == self._owner(config) or chat_id in config.get('subscriptions', {}):
+            return True
+        if chat_id in [str(allowed) for allowed in config.get('allowed_chat_ids', [])]:
+            return True
+        return bool(config.get('open_subscriptions', False))
+    
+    def save(self, chat_id: str, settings: Dict):
+        """Create or replace a chat's subscription"""
+        config = self.config_manager.get_config()
+        settings = dict(settings)
+        subscriptions = config.setdefault('subscriptions', {})
+        
+        if chat_id == self._owner(config):
+            config['enabled_categories'] = settings.pop('categories', [])
+            if settings:
+                subscriptions[chat_id] = settings
+            else:
+                subscriptions.pop(chat_id, None)
+        else:
+            subscriptions[chat_id] = settings
+        
+        if not subscriptions:
+            config.pop('subscriptions')
+        self.config_manager.save_config(config)
+    
+    def remove(self, chat_id: str):
+        """Unsubscribe a chat (the owner can only clear its categories)"""
+        config = self.config_manager.get_config()
+        if chat_id == self._owner(config):
+            self.save(chat_id, {'categories': []})
+            return
+        
+        subscriptions = config.get('subscriptions', {})
+        if subscriptions.pop(chat_id, None) is not None:
+            if not subscriptions:
+                config.pop('subscriptions')
+            self.config_manager.save_config(config)
+    
+    def _cached(self, attribute: str, build: Callable[[Dict[str, Dict]], object]):
+        """
+        Value built from all subscriptions, rebuilt only when the config changes.
+        
+        The config is read outside the lock: reading it may reload
+        config.json and call _on_config_change, which takes the lock.
+        """
+        self.config_manager.reload_if_changed()
+        with self._lock:
+            value = getattr(self, attribute)
+            generation = self._generation
+        if value is None:
+            value = build(self.all())
+            with self._lock:
+                # Don't cache a value built from a config that changed meanwhile
+                if generation == self._generation:
+                    setattr(self, attribute, value)
+        return value
+    
+    @staticmethod
+    def _build_index(subscriptions: Dict[str, Dict]) -> Dict[str, List[str]]:
+        index = {}
+        for chat_id, settings in subscriptions.items():
+            for slug in settings.get('categories', []):
+                subscribers = index.setdefault(slug, [])
+                if chat_id not in subscribers:
+                    subscribers.append(chat_id)
+        return index
+    
+    def index(self) -> Dict[str, List[str]]:
+        """Category slug -> subscribed chat IDs, rebuilt only when the config changes"""
+        return self._cached('_index', self._build_index)
+    
+    def filter_engine(self) -> FilterEngine:
+        """Compiled filters of all chats, rebuilt only when the config changes"""
+        return self._cached('_filters', FilterEngine)
+
+
+class SeenStore(ABC):
+    """
+    Persistent set of already notified job IDs.
+    
+    Additions are buffered in memory and written in one batch by commit().
+    Membership checks never touch the disk.
+    """
+    
+    def __init__(self):
+        self._ids = {}  # job ID -> first seen timestamp
+        self._pending = {}
+    
+    def __contains__(self, job_id) -> bool:
+        return job_id in self._ids
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __iter__(self):
+        return iter(self._ids)
+    
+    def add(self, job_id: str):
+        """Mark a job as seen (persisted on the next commit)"""
+        if job_id not in self._ids:
+            now = time.time()
+            self._ids[job_id] = now
+            self._pending[job_id] = now
+    
+    def add_many(self, job_ids):
+        for job_id in job_ids:
+            self.add(job_id)
+    
+    def commit(self):
+        """Persist IDs added since the last commit"""
+        if self._pending:
+            self._write(self._pending)
+            self._pending = {}
+    
+    def evict_older_than(self, max_age_seconds: float) -> int:
+        """Forget IDs first seen more than max_age_seconds ago"""
+        cutoff = time.time() - max_age_seconds
+        expired = [job_id for job_id, seen_at in self._ids.items() if seen_at < cutoff]
+        if expired:
+            self.commit()
+            for job_id in expired:
+                del self._ids[job_id]
+            self._delete(cutoff)
+        return len(expired)
+    
+    @abstractmethod
+    def _write(self, entries: Dict[str, float]):
+        """Persist newly seen IDs with their first seen timestamps"""
+    
+    @abstractmethod
+    def _delete(self, cutoff: float):
+        """Remove IDs first seen before cutoff from storage"""
+    
+    @abstractmethod
+    def get_meta(self, key: str, default=None):
+        """A JSON value stored alongside the IDs (e.g. high-water marks)"""
+    
+    @abstractmethod
+    def set_meta(self, key: str, value):
+        """Store a JSON value alongside the IDs"""
+    
+    def close(self):
+        self.commit()
+
+
+class SqliteSeenStore(SeenStore):
+    """
+    Seen job IDs in an SQLite database (WAL mode, one transaction per commit).
+    
+    With preload=False the IDs aren't read into memory up front; membership
+    is looked up by primary key instead, which suits one-shot runs that only
+    check a few dozen cards.
+    """
+    
+    def __init__(self, path: Path, preload: bool = True):
+        super().__init__()
+        self.path = path
+        self.preload = preload
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS seen_first_seen ON seen (first_seen)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if preload:
+            self._ids = dict(self._db.execute("SELECT id, first_seen FROM seen"))
+    
+    def __contains__(self, job_id) -> bool:
+        if job_id in self._ids or self.preload:
+            return job_id in self._ids
+        row = self._db.execute("SELECT first_seen FROM seen WHERE id = ?", (job_id,)).fetchone()
+        if row:
+            self._ids[job_id] = row[0]
+        return row is not None
+    
+    def __len__(self) -> int:
+        if self.preload:
+            return len(self._ids)
+        return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0] + len(self._pending)
+    
+    def __iter__(self):
+        if self.preload:
+            return iter(self._ids)
+        return iter({row[0] for row in self._db.execute("SELECT id FROM seen")} | set(self._pending))
+    
+    def evict_older_than(self, max_age_seconds: float) -> int:
+        if self.preload:
+            return super().evict_older_than(max_age_seconds)
+        cutoff = time.time() - max_age_seconds
+        self.commit()
+        self._ids = {job_id: seen_at for job_id, seen_at in self._ids.items() if seen_at >= cutoff}
+        with self._db:
+            return self._db.execute("DELETE FROM seen WHERE first_seen < ?", (cutoff,)).rowcount
+    
+    def _write(self, entries: Dict[str, float]):
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO seen (id, first_seen) VALUES (?, ?)", entries.items())
+    
+    def _delete(self, cutoff: float):
+        with self._db:
+            self._db.execute("DELETE FROM seen WHERE first_seen < ?", (cutoff,))
+    
+    def get_meta(self, key: str, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def set_meta(self, key: str, value):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+    
+    def close(self):
+        super().close()
+        self._db.close()
+
+
+class LogSeenStore(SeenStore):
+    """
+    Seen job IDs in an append-only text log.
+    
+    Each commit appends "<id>\\t<timestamp>" lines and fsyncs; metadata is
+    appended as "!<key>\\t<json>" lines (last one wins). Eviction rewrites the
+    log atomically, and so does a metadata update once superseded metadata
+    lines outnumber the live ones.
+    """
+    
+    # Superseded metadata lines tolerated before the log is compacted
+    MIN_COMPACT_LINES = 64
+    
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self._meta = {}
+        self._stale_lines = 0
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, sep, value = line.rstrip('\n').partition('\t')
+                    if not sep:
+                        continue  # torn write from a crash
+                    try:
+                        if key.startswith('!'):
+                            self._stale_lines += key[1:] in self._meta
+                            self._meta[key[1:]] = json.loads(value)
+                        else:
+                            self._ids.setdefault(key, float(value))
+                    except ValueError:
+                        continue
+    
+    def _append(self, lines: List[str]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _write(self, entries: Dict[str, float]):
+        self._append([f"{job_id}\t{seen_at}\n" for job_id, seen_at in entries.items()])
+    
+    def _delete(self, cutoff: float):
+        self._rewrite()
+    
+    def _rewrite(self):
+        """Replace the log with one line per live ID and metadata key"""
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, value in self._meta.items():
+                f.write(f"!{key}\t{json.dumps(value, ensure_ascii=False)}\n")
+            for job_id, seen_at in self._ids.items():
+                f.write(f"{job_id}\t{seen_at}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._stale_lines = 0
+    
+    def get_meta(self, key: str, default=None):
+        return self._meta.get(key, default)
+    
+    def set_meta(self, key: str, value):
+        self._stale_lines += key in self._meta
+        self._meta[key] = value
+        if self._stale_lines > max(self.MIN_COMPACT_LINES, len(self._ids) + len(self._meta)):
+            self.commit()
+            self._rewrite()
+        else:
+            self._append([f"!{key}\t{json.dumps(value, ensure_ascii=False)}\n"])
+
+
+SEEN_STORES = {
+    'sqlite': (SqliteSeenStore, SEEN_JOBS_DB),
+    'log': (LogSeenStore, SEEN_JOBS_LOG),
+}
+
+
+def create_seen_store(backend: str = "sqlite", preload: bool = True) -> SeenStore:
+    """Open the seen-job store, migrating a legacy seen_jobs.json once"""
+    store_class, path = SEEN_STORES.get(backend, SEEN_STORES['sqlite'])
+    store = store_class(path, preload) if store_class is SqliteSeenStore else store_class(path)
+    
+    if SEEN_JOBS_FILE.exists():
+        with open(SEEN_JOBS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        store.add_many(data.get('seen_ids', []))
+        store.commit()
+        if data.get('high_water'):
+            store.set_meta('high_water', data['high_water'])
+        
+        SEEN_JOBS_FILE.rename(SEEN_JOBS_FILE.with_suffix('.json.migrated'))
+        logger.info(f"Migrated {len(data.get('seen_ids', []))} seen jobs to {path.name}")
+    
+    return store
+
+
+class JobArchive:
+    """
+    Every scraped job in SQLite, with an FTS5 index for /search.
+    
+    Jobs are upserted whenever a check or /latest scrapes them. Checks
+    only parse unseen cards, so jobs seen before the archive existed get
+    in only through /latest.
+    
+    Title, description, subcategory and location are indexed with
+    diacritics folded, so "flizesana" finds "flīzēšana"; every word of a
+    query must match the start of a word in the job. The newest matches are
+    ranked by BM25 with title matches weighted highest, which keeps common
+    words fast however large the archive grows. Numeric prices are indexed
+    for price_range().
+    """
+    
+    # BM25 weights of the indexed columns, in FTS column order
+    WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+    # Most recent matches that get ranked
+    CANDIDATES = 2000
+    # Fields only a job's detail page provides (see parse_job_details)
+    DETAIL_FIELDS = DETAIL_FIELDS
+    # A job archived before is only rewritten (and re-indexed) when one of these changed
+    TRACKED_FIELDS = ('title', 'description', 'subcategory', 'location', 'price', 'price_value') + DETAIL_FIELDS
+    
+    def __init__(self, path: Path = None):
+        self.path = path or JOB_ARCHIVE_DB
+        self._connection = None
+        self._lock = threading.Lock()
+    
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """
+        The database, opened (and created) on first use, so runs that
+        never touch the archive (an idle --once) don't pay for it.
+        Callers hold _lock.
+        """
+        if self._connection is None:
+            self._connection = self._open()
+        return self._connection
+    
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        with db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    seq INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    subcategory TEXT,
+                    location TEXT,
+                    price_value REAL,
+                    currency TEXT,
+                    archived_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                    title, description, subcategory, location,
+                    content='jobs', content_rowid='seq', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+                    INSERT INTO jobs_fts (rowid, title, description, subcategory, location)
+                    VALUES (new.seq, new.title, new.description, new.subcategory, new.location);
+                END;
+                CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+                    INSERT INTO jobs_fts (jobs_fts, rowid, title, description, subcategory, location)
+                    VALUES ('delete', old.seq, old.title, old.description, old.subcategory, old.location);
+                END;
+                CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE ON jobs BEGIN
+                    INSERT INTO jobs_fts (jobs_fts, rowid, title, description, subcategory, location)
+                    VALUES ('delete', old.seq, old.title, old.description, old.subcategory, old.location);
+                    INSERT INTO jobs_fts (rowid, title, description, subcategory, location)
+                    VALUES (new.seq, new.title, new.description, new.subcategory, new.location);
+                END;
+            """)
+            # Archives created before prices were parsed
+            columns = [row[1] for row in db.execute("PRAGMA table_info(jobs)")]
+            if 'price_value' not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN price_value REAL")
+                db.execute("ALTER TABLE jobs ADD COLUMN currency TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_price ON jobs (price_value)")
+        return db
+    
+    def add(self, jobs: List[Dict]):
+        """
+        Archive new jobs and refresh changed ones, in one transaction.
+        
+        A job archived before keeps its archived_at and the detail page
+        fields the new copy lacks.
+        """
+        if not jobs:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            previous = {}
+            ids = [job['id'] for job in jobs]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                previous.update(
+                    (job_id, json.loads(payload)) for job_id, payload in self._db.execute(
+                        f"SELECT id, payload FROM jobs WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                    )
+                )
+            
+            rows = []
+            for job in jobs:
+                old = previous.get(job['id'])
+                # Compared before copying, so unchanged jobs cost no payload
+                if old is not None and all(
+                    old.get(key) == job.get(key, old.get(key) if key in self.DETAIL_FIELDS else None)
+                    for key in self.TRACKED_FIELDS
+                ):
+                    continue
+                
+                payload = dict(job)
+                if old is not None:
+                    for key in self.DETAIL_FIELDS:
+                        if key in old and key not in payload:
+                            payload[key] = old[key]
+                rows.append((
+                    job['id'],
+                    job['title'],
+                    payload.get('full_description') or job.get('description') or "",
+                    job.get('subcategory'),
+                    job.get('location'),
+                    job.get('price_value'),
+                    job.get('currency'),
+                    now,
+                    json.dumps(payload, ensure_ascii=False)
+                ))
+            
+            self._db.executemany(
+                "INSERT INTO jobs "
+                "(id, title, description, subcategory, location, price_value, currency, archived_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET title = excluded.title, description = excluded.description, "
+                "subcategory = excluded.subcategory, location = excluded.location, "
+                "price_value = excluded.price_value, currency = excluded.currency, payload = excluded.payload",
+                rows
+            )
+    
+    @staticmethod
+    def _match_query(query: str) -> str:
+        """FTS5 query requiring every word of query as a word prefix"""
+        return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Best matching archived jobs, each with an archived_at timestamp
+        
+        Returns:
+            List of job dicts, best match first
+        """
+        match = self._match_query(query)
+        if not match:
+            return []
+        
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT jobs.payload, jobs.archived_at FROM ("
+                f"  SELECT rowid, bm25(jobs_fts, {', '.join(map(str, self.WEIGHTS))}) AS score FROM jobs_fts"
+                "   WHERE jobs_fts MATCH ? ORDER BY rowid DESC LIMIT ?"
+                ") AS matches JOIN jobs ON jobs.seq = matches.rowid ORDER BY matches.score LIMIT ?",
+                (match, self.CANDIDATES, limit)
+            ).fetchall()
+        return [dict(json.loads(payload), archived_at=archived_at) for payload, archived_at in rows]
+    
+    def price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+                    limit: int = 10) -> List[Dict]:
+        """
+        Archived jobs priced within [min_price, max_price] (either bound optional), via the price index
+        
+        Returns:
+            List of job dicts with archived_at, most expensive first
+        """
+        low = min_price if min_price is not None else float('-inf')
+        high = max_price if max_price is not None else float('inf')
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload, archived_at FROM jobs WHERE price_value BETWEEN ? AND ? "
+                "ORDER BY price_value DESC LIMIT ?",
+                (low, high, limit)
+            ).fetchall()
+        return [dict(json.loads(payload), archived_at=archived_at) for payload, archived_at in rows]
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class TokenBucket:
+    """Token bucket rate limiter (not thread-safe, used by the sender thread only)"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+    
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class NotificationOutbox:
+    """
+    Persisted queue of job notifications, drained by a background sender.
+    
+    Sending is rate limited with token buckets (Telegram allows about one
+    message per second per chat and 30 per second overall). A 429 pauses all
+    sending for the retry_after Telegram asks for, as its flood limit is per
+    bot; other failures are retried with exponential backoff. A message
+    Telegram rejects as malformed (400) is resent once as plain text; only
+    permanent errors (chat not found, bot blocked) drop a message.
+    
+    When at least digest_threshold job notifications are due for a chat they
+    are coalesced into digest messages. With a digest_window, jobs queued for
+    a chat are held until the window opened by the first of them closes, so
+    bursts spread over several cycles end up in the same digest. A burst too
+    long for one message goes out as several digests, the remainder
+    included however small it is.
+    """
+    
+    PERMANENT_ERRORS = (400, 403)
+    
+    def __init__(self, bot: 'TelegramBot', path: Path = OUTBOX_DB, global_rate: float = 25.0,
+                 per_chat_rate: float = 1.0, max_backoff: float = 300.0,
+                 digest_threshold: int = 5, digest_window: float = 0):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        self.max_backoff = max_backoff
+        self.digest_threshold = digest_threshold
+        self.digest_window = digest_window
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets = {}
+        self._digest_remainders = set()  # chats whose last digest left jobs behind
+        self._paused_until = 0.0  # monotonic time (after a 429)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt, id)")
+    
+    def add_jobs(self, chat_id: str, jobs: List[Dict]):
+        """Queue job notifications for a chat (one transaction)"""
+        self.add_routes({chat_id: jobs})
+    
+    def add_routes(self, routes: Dict[str, List[Dict]]):
+        """Queue job notifications for many chats in one transaction"""
+        now = time.time()
+        with self._lock, self._db:
+            for chat_id, jobs in routes.items():
+                if not jobs:
+                    continue
+                
+                due = now
+                if self.digest_window > 0:
+                    # Join the chat's open window, or open a new one
+                    open_window = self._db.execute(
+                        "SELECT MAX(next_attempt) FROM outbox WHERE chat_id = ? AND kind = 'job' "
+                        "AND attempts = 0 AND next_attempt > ?",
+                        (chat_id, now)
+                    ).fetchone()[0]
+                    due = open_window or now + self.digest_window
+                
+                rows = [(chat_id, 'job', json.dumps(dict(job), ensure_ascii=False), due, now) for job in jobs]
+                self._db.executemany(
+                    "INSERT INTO outbox (chat_id, kind, payload, next_attempt, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        self._wakeup.set()
+    
+    def add_message(self, chat_id: str, text: str):
+        """Queue a plain text message"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO outbox (chat_id, kind, payload, next_attempt, created_at) VALUES (?, 'text', ?, ?, ?)",
+                (chat_id, text, now, now)
+            )
+        self._wakeup.set()
+    
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    
+    @staticmethod
+    def pending_on_disk(path: Path = OUTBOX_DB) -> int:
+        """Messages left in an outbox database, without opening an outbox"""
+        if not path.exists():
+            return 0
+        db = sqlite3.connect(str(path))
+        try:
+            return db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            db.close()
+    
+    def start(self):
+        """Start the background sender thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def drain(self, timeout: float = 120) -> bool:
+        """Send queued messages in the calling thread; returns True if the outbox emptied"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            wait = self._send_due()
+            if wait is None:
+                return True
+            time.sleep(min(wait, max(0, deadline - time.monotonic())))
+        return self.pending_count() == 0
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self._send_due()
+            except Exception as e:
+                logger.error(f"Outbox sender error: {e}")
+                wait = 5
+            
+            if wait == 0:
+                continue
+            self._wakeup.wait(timeout=60 if wait is None else wait)
+            self._wakeup.clear()
+    
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, max(1.0, self.per_chat_rate))
+        return bucket
+    
+    def _send_due(self) -> Optional[float]:
+        """
+        Send the oldest due message of every chat the rate limits allow.
+        
+        Returns:
+            Seconds until the next message could be sent (0 = call again
+            right away), or None if the outbox is empty
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, chat_id, kind, payload, attempts FROM outbox WHERE id IN "
+                "(SELECT MIN(id) FROM outbox WHERE next_attempt <= ? GROUP BY chat_id) ORDER BY id",
+                (now,)
+            ).fetchall()
+            next_due = self._db.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()[0]
+        
+        if next_due is None:
+            return None
+        
+        waits = [next_due - now] if next_due > now else []
+        sent_any = False
+        for row_id, chat_id, kind, payload, attempts in rows:
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._chat_bucket(chat_id).wait_time(),
+                self._global_bucket.wait_time()
+            )
+            if wait > 0:
+                waits.append(wait)
+                continue
+            
+            if kind == 'job':
+                self._send_jobs(chat_id, row_id, payload, attempts, now)
+            else:
+                self._send(chat_id, payload, [row_id], attempts)
+            sent_any = True
+        
+        if sent_any:
+            return 0.0
+        return min(waits) if waits else 1.0
+    
+    def _send_jobs(self, chat_id: str, row_id: int, payload: str, attempts: int, now: float):
+        """Send the chat's next job notification, or a digest if enough are due"""
+        if self.digest_threshold > 1:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, payload, attempts FROM outbox WHERE chat_id = ? AND kind = 'job' "
+                    "AND next_attempt <= ? ORDER BY id",
+                    (chat_id, now)
+                ).fetchall()
+            
+            if len(rows) >= self.digest_threshold or chat_id in self._digest_remainders:
+                text, count = self.bot.format_job_digest([json.loads(row[1]) for row in rows])[0]
+                # The rest of a split burst goes into the next digest, not one message per job
+                if count < len(rows):
+                    self._digest_remainders.add(chat_id)
+                else:
+                    self._digest_remainders.discard(chat_id)
+                rows = rows[:count]
+                logger.info(f"Sending digest of {count} jobs to chat {chat_id}")
+                self._send(chat_id, text, [row[0] for row in rows], max(row[2] for row in rows))
+                return
+        
+        self._send(chat_id, self.bot.format_job_message(json.loads(payload)), [row_id], attempts)
+    
+    @staticmethod
+    def _plain_text(text: str) -> str:
+        """A message's HTML markup removed, links kept as "text: URL\""""
+        text = re.sub(r'<a href="([^"]*)">(.*?)</a>', r'\2: \1', text, flags=re.DOTALL)
+        return html.unescape(re.sub(r'<[^>]+>', '', text))
+    
+    def _send(self, chat_id: str, text: str, row_ids: List[int], attempts: int,
+              parse_mode: Optional[str] = "HTML"):
+        """Send one message covering the given outbox rows"""
+        self._chat_bucket(chat_id).consume()
+        self._global_bucket.consume()
+        
+        started = time.perf_counter()
+        try:
+            self.bot.api.send_message(chat_id, text, parse_mode=parse_mode)
+        except TelegramApiError as e:
+            if e.retry_after:
+                SEND_SECONDS.observe(time.perf_counter() - started, outcome='rate_limited')
+                logger.warning(f"Telegram rate limit (from chat {chat_id}), pausing all sending for {e.retry_after}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                return
+            if e.error_code == 400 and parse_mode:
+                SEND_SECONDS.observe(time.perf_counter() - started, outcome='error')
+                logger.error(f"Telegram rejected a message for chat {chat_id} ({e}), resending as plain text: {text!r}")
+                self._send(chat_id, self._plain_text(text), row_ids, attempts, parse_mode=None)
+                return
+            if e.error_code in self.PERMANENT_ERRORS:
+                SEND_SECONDS.observe(time.perf_counter() - started, outcome='dropped')
+                logger.error(f"Dropping {len(row_ids)} notification(s) for chat {chat_id}: {e}")
+                self._delete(row_ids)
+                return
+            SEND_SECONDS.observe(time.perf_counter() - started, outcome='error')
+            self._retry_later(row_ids, attempts, e)
+            return
+        except requests.RequestException as e:
+            SEND_SECONDS.observe(time.perf_counter() - started, outcome='error')
+            self._retry_later(row_ids, attempts, e)
+            return
+        
+        SEND_SECONDS.observe(time.perf_counter() - started, outcome='ok')
+        now = time.time()
+        for created_at in self._created_at(row_ids):
+            NOTIFY_DELAY.observe(now - created_at)
+        self._delete(row_ids)
+    
+    def _created_at(self, row_ids: List[int]) -> List[float]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                f"SELECT created_at FROM outbox WHERE id IN ({','.join('?' * len(row_ids))})", row_ids
+            )]
+    
+    def _delete(self, row_ids: List[int]):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in row_ids])
+    
+    def _retry_later(self, row_ids: List[int], attempts: int, error: Exception):
+        delay = min(self.max_backoff, 2 ** attempts) * random.uniform(0.8, 1.2)
+        logger.warning(f"Failed to send notification (attempt {attempts + 1}), retrying in {delay:.0f}s: {error}")
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?",
+                [(time.time() + delay, row_id) for row_id in row_ids]
+            )
+    
+    def close(self):
+        self.stop()
+        self._db.close()
+
+
+class PollScheduler:
+    """
+    Per-category poll timing driven by each category's observed posting rate.
+    
+    The arrival rate (new jobs per hour) is a time-weighted moving average
+    updated after every poll, so a category's history counts less the older
+    it is. Each category is polled often enough to expect about
+    target_new_jobs per poll, within [min_interval, max_interval]. When all
+    categories together would exceed an optional requests_per_hour, every
+    interval is stretched by the same factor, but never past max_interval.
+    New categories start spread over their
+    first interval and each poll is jittered, so polls don't fire together.
+    """
+    
+    RATE_HALF_LIFE = 3 * 3600
+    
+    def __init__(self, min_interval: float, max_interval: float, requests_per_hour: float = 0,
+                 adaptive: bool = True, rates: Optional[Dict[str, float]] = None,
+                 target_new_jobs: float = 0.5, jitter: float = 0.1):
+        """
+        Args:
+            min_interval: Shortest wait between polls of a category (seconds)
+            max_interval: Longest wait between polls of a category (seconds)
+            requests_per_hour: Global poll budget (0 = unlimited)
+            adaptive: False polls every category together every max_interval
+            rates: Arrival rates (jobs/hour) saved by a previous run
+            target_new_jobs: Expected new jobs per poll to aim for
+            jitter: Random +/- fraction applied to each interval
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.requests_per_hour = requests_per_hour
+        self.adaptive = adaptive
+        self.rates = dict(rates or {})
+        self.target_new_jobs = target_new_jobs
+        self.jitter = jitter
+        self._next_due = {}
+        self._last_poll = {}
+    
+    def sync(self, categories: List[str], now: Optional[float] = None):
+        """Start scheduling new categories and forget removed ones"""
+        now = time.time() if now is None else now
+        for slug in list(self._next_due):
+            if slug not in categories:
+                del self._next_due[slug]
+                self._last_poll.pop(slug, None)
+        
+        new = [slug for slug in categories if slug not in self._next_due]
+        for position, slug in enumerate(new):
+            self._next_due[slug] = now
+            if self.adaptive:
+                self._next_due[slug] += self.interval(slug) * position / len(new)
+    
+    def _base_interval(self, slug: str) -> float:
+        rate = self.rates.get(slug, 0)
+        if not self.adaptive or rate <= 0:
+            return self.max_interval
+        interval = self.target_new_jobs * 3600 / rate
+        return min(self.max_interval, max(self.min_interval, interval))
+    
+    def interval(self, slug: str) -> float:
+        """Seconds between polls of a category, within the global budget and max_interval"""
+        interval = self._base_interval(slug)
+        if self.adaptive and self.requests_per_hour > 0:
+            polls_per_hour = sum(3600 / self._base_interval(other) for other in self._next_due)
+            interval *= max(1.0, polls_per_hour / self.requests_per_hour)
+        return min(self.max_interval, interval)
+    
+    def interval_range(self) -> Tuple[float, float]:
+        """Shortest and longest interval currently in effect across categories (seconds)"""
+        intervals = [self.interval(slug) for slug in self._next_due] or [self.max_interval]
+        return min(intervals), max(intervals)
+    
+    def reschedule(self):
+        """Pull scheduled polls forward after the bounds were tightened"""
+        for slug, when in self._next_due.items():
+            last = self._last_poll.get(slug)
+            if last is not None:
+                self._next_due[slug] = min(when, last + self.interval(slug))
+    
+    def next_due(self) -> float:
+        """Time of the earliest scheduled poll"""
+        return min(self._next_due.values(), default=time.time() + self.max_interval)
+    
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Categories whose poll is due, most overdue first"""
+        now = time.time() if now is None else now
+        due = [slug for slug, when in self._next_due.items() if when <= now]
+        return sorted(due, key=self._next_due.get)
+    
+    def record(self, slug: str, new_jobs: int, now: Optional[float] = None):
+        """Update a category's arrival rate after a poll and schedule the next one"""
+        now = time.time() if now is None else now
+        # The first poll of a run can't tell how long its new jobs took to arrive
+        last = self._last_poll.get(slug)
+        if last is not None and now > last:
+            elapsed = now - last
+            observed = new_jobs * 3600 / elapsed
+            if slug in self.rates:
+                weight = 1 - 0.5 ** (elapsed / self.RATE_HALF_LIFE)
+                self.rates[slug] += weight * (observed - self.rates[slug])
+            else:
+                self.rates[slug] = observed
+        self._last_poll[slug] = now
+        
+        interval = self.interval(slug)
+        if self.adaptive:
+            interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._next_due[slug] = now + interval
+
+
+class CycleProfiler:
+    """
+    CPU profile (cProfile) or allocation diff (tracemalloc) over the next
+    N check cycles.
+    
+    The CPU profile covers the cycle's own thread and the threads started
+    during it (the category fetch/parse workers), but not the long-running
+    outbox sender or update threads. Python 3.12+ allows only one active
+    cProfile profiler per process, so there only the cycle's thread is
+    profiled and the caller runs the category fetches in it (sequential);
+    detail page workers go unprofiled. tracemalloc covers all threads.
+    """
+    
+    MODES = ('cpu', 'memory')
+    TOP = 12
+    # One profiler per thread, which Python 3.12+ refuses
+    PER_THREAD = sys.version_info < (3, 12)
+    
+    def __init__(self, mode: str = 'cpu', cycles: int = 3, chat_id: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        import cProfile
+        import tracemalloc
+        self.mode = mode
+        self.cycles = cycles
+        self.chat_id = chat_id
+        self.done_cycles = 0
+        self._started_at = datetime.now()
+        self._profile = cProfile.Profile() if mode == 'cpu' else None
+        # Whether the cycle should fetch categories in its own thread
+        self.sequential = self._profile is not None and not self.PER_THREAD
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._owns_tracemalloc = False
+        
+        if mode == 'memory':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._owns_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+    
+    def _profile_thread(self, frame, event, arg):
+        """threading.setprofile hook: gives each new thread its own profiler"""
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            # Replaces this hook for the rest of the thread
+            profile.enable()
+        except Exception as e:
+            # Never let profiling kill the thread, just leave it unprofiled
+            sys.setprofile(None)
+            logger.debug(f"Can't profile thread {threading.current_thread().name}: {e}")
+            return
+        with self._lock:
+            self._thread_profiles.append(profile)
+    
+    def before_cycle(self):
+        if self._profile:
+            if self.PER_THREAD:
+                threading.setprofile(self._profile_thread)
+            self._profile.enable()
+    
+    def after_cycle(self) -> bool:
+        """Returns True once all requested cycles were captured"""
+        if self._profile:
+            self._profile.disable()
+            threading.setprofile(None)
+        self.done_cycles += 1
+        return self.done_cycles >= self.cycles
+    
+    @staticmethod
+    def _short_path(filename: str) -> str:
+        return '/'.join(Path(filename).parts[-2:])
+    
+    def finish(self) -> Tuple[Path, str]:
+        """Write the full report to PROFILES_DIR; returns (report path, plain-text summary)"""
+        import io
+        import pstats
+        import tracemalloc
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = self._started_at.strftime('%Y%m%d-%H%M%S')
+        
+        if self._profile:
+            report = io.StringIO()
+            stats = pstats.Stats(self._profile, *self._thread_profiles, stream=report)
+            stats.dump_stats(str(PROFILES_DIR / f"cpu-{stamp}.prof"))
+            stats.sort_stats('cumulative').print_stats(40)
+            stats.sort_stats('tottime').print_stats(40)
+            path = PROFILES_DIR / f"cpu-{stamp}.txt"
+            path.write_text(report.getvalue(), encoding='utf-8')
+            
+            total = sum(entry[2] for entry in stats.stats.values())
+            hottest = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.TOP]
+            lines = [f"CPU profile of {self.done_cycles} cycle(s), {total:.2f}s own time; top by own time:"]
+            for (filename, line, function), (_, calls, own, cumulative, _) in hottest:
+                lines.append(
+                    f"{own:7.3f}s {cumulative:7.3f}s cum {calls:>7} {function} ({self._short_path(filename)}:{line})"
+                )
+        else:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__)
+            ])
+            differences = snapshot.compare_to(self._baseline, 'lineno')
+            current, peak = tracemalloc.get_traced_memory()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+            
+            path = PROFILES_DIR / f"memory-{stamp}.txt"
+            path.write_text('\n'.join(str(difference) for difference in differences[:100]) + '\n', encoding='utf-8')
+            
+            lines = [
+                f"Allocation growth over {self.done_cycles} cycle(s); traced {current / 1048576:.1f} MB, "
+                f"peak {peak / 1048576:.1f} MB; top allocators:"
+            ]
+            for difference in differences[:self.TOP]:
+                frame = difference.traceback[0]
+                lines.append(
+                    f"{difference.size_diff / 1024:+9.1f} KB {difference.count_diff:+7} blocks "
+                    f"{self._short_path(frame.filename)}:{frame.lineno}"
+                )
+        
+        lines.append(f"Full report: {path}")
+        return path, '\n'.join(lines)
 
 
 class JobMonitor:
     """Main job monitoring class"""
     
-    def __init__(self):
-        self.scraper = GetaProScraper()
-        self.config_manager = ConfigManager()
-        self.seen_jobs = self._load_seen_jobs()
+    # Seconds between saves of the drifting poll rates
+    RATES_SAVE_INTERVAL = 15 * 60
+    
+    def __init__(self, one_shot: bool = False):
+        """
+        Args:
+            one_shot: Set up for a single check (--once): config.json is read
+                once, seen IDs are looked up instead of loaded, and the
+                Telegram bot is only created when there is something to send
+        """
+        self.config_manager = ConfigManager(watch=not one_shot)
         self.bot = None
+        self._stopped = threading.Event()
+        self.profiler = None
         
         config = self.config_manager.get_config()
-        if config.get('telegram_bot_token') and config.get('telegram_chat_id'):
+        self.seen_jobs = create_seen_store(config.get('seen_store', 'sqlite'), preload=not one_shot)
+        self.seen_ttl = config.get('seen_ttl_days', 90) * 86400
+        self._last_eviction = 0
+        # Highest job ID seen per category, enables multi-page crawling
+        self.high_water = self.seen_jobs.get_meta('high_water', {})
+        self.scraper = GetaProScraper(
+            max_workers=config.get('max_concurrent_requests', 4),
+            requests_per_second=config.get('requests_per_second', 2.0),
+            parser=config.get('parser', 'auto'),
+            cache_ttl=config.get('listing_cache_ttl', 60),
+            cache_max_jobs=config.get('listing_cache_max_jobs', 2000),
+            max_retries=config.get('fetch_retries', 2),
+            breaker_failures=config.get('breaker_failures', 3),
+            breaker_reset=config.get('breaker_reset_seconds', 300)
+        )
+        self.subscriptions = SubscriptionManager(self.config_manager)
+        self.details = DetailCache() if config.get('fetch_details', False) else None
+        self.archive = JobArchive() if config.get('job_archive', True) else None
+        self.scheduler = PollScheduler(
+            min_interval=config.get('min_check_interval_minutes', 2) * 60,
+            max_interval=config.get('check_interval_minutes', 10) * 60,
+            requests_per_hour=config.get('max_requests_per_hour', 0),
+            adaptive=config.get('adaptive_polling', True),
+            rates=self.seen_jobs.get_meta('poll_rates', {})
+        )
+        self._saved_rates = dict(self.scheduler.rates)
+        self._rates_saved_at = time.time()
+        self.outbox = None
+        if not one_shot:
+            self.ensure_notifier()
+    
+    def ensure_notifier(self) -> bool:
+        """Create the Telegram bot and outbox if configured; returns whether they exist"""
+        if self.outbox is None:
+            config = self.config_manager.get_config()
+            if not (config.get('telegram_bot_token') and config.get('telegram_chat_id')):
+                return False
             self.bot = TelegramBot(
                 config['telegram_bot_token'],
-                config['telegram_chat_id']
+                config['telegram_chat_id'],
+                subscriptions=self.subscriptions,
+                scraper=self.scraper,
+                archive=self.archive,
+                scheduler=self.scheduler
+            )
+            self.outbox = NotificationOutbox(
+                self.bot,
+                global_rate=config.get('telegram_global_rate', 25),
+                per_chat_rate=config.get('telegram_chat_rate', 1),
+                digest_threshold=config.get('digest_threshold', 5),
+                digest_window=config.get('digest_window_seconds', 0)
             )
+        return True
     
-    def _load_seen_jobs(self) -> set:
-        """Load set of already seen job IDs"""
-        if SEEN_JOBS_FILE.exists():
-            with open(SEEN_JOBS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(data.get('seen_ids', []))
-        return set()
-    
-    def _save_seen_jobs(self):
-        """Save seen job IDs to file"""
-        with open(SEEN_JOBS_FILE, 'w', encoding='utf-8') as f:
-            json.dump({
-                'seen_ids': list(self.seen_jobs),
-                'last_updated': datetime.now().isoformat()
-            }, f, indent=2)
-    
-    def check_for_new_jobs(self) -> List[Dict]:
-        """Check for new jobs and notify"""
+    def _save_seen_jobs(self, high_water_before: Dict[str, int]):
+        """Persist newly seen job IDs, changed high-water marks and poll rates, and evict old IDs"""
+        self.seen_jobs.commit()
+        if self.high_water != high_water_before:
+            self.seen_jobs.set_meta('high_water', self.high_water)
+        self._save_poll_rates()
+        
+        if self.seen_ttl > 0 and time.time() - self._last_eviction > 86400:
+            evicted = self.seen_jobs.evict_older_than(self.seen_ttl)
+            if evicted:
+                logger.info(f"Evicted {evicted} seen jobs older than {self.seen_ttl // 86400} days")
+            self._last_eviction = time.time()
+    
+    def _save_poll_rates(self, force: bool = False):
+        """
+        Persist changed poll rates at most every RATES_SAVE_INTERVAL seconds.
+        
+        The rates drift a little after nearly every poll, and losing a few
+        minutes of that drift on a crash costs nothing; force saves them
+        regardless, e.g. on shutdown.
+        """
+        if self.scheduler.rates == self._saved_rates:
+            return
+        if not force and time.time() - self._rates_saved_at < self.RATES_SAVE_INTERVAL:
+            return
+        self.seen_jobs.set_meta('poll_rates', self.scheduler.rates)
+        self._saved_rates = dict(self.scheduler.rates)
+        self._rates_saved_at = time.time()
+    
+    def check_for_new_jobs(self, categories: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Check for new jobs and notify
+        
+        Args:
+            categories: Only check these of the subscribed categories (default: all)
+        """
         config = self.config_manager.get_config()
-        categories = config.get('enabled_categories', [])
+        # Each category is scraped once, however many chats follow it
+        subscribers = self.subscriptions.index()
+        if categories is None:
+            categories = list(subscribers)
+        else:
+            categories = [slug for slug in categories if slug in subscribers]
         
         if not categories:
             logger.warning("No categories enabled in config!")
@@ -668,38 +3632,127 @@ class JobMonitor:
         
         logger.info(f"Checking categories: {categories}")
         
-        # Scrape jobs from enabled categories
-        jobs = self.scraper.scrape_all_categories(categories)
+        # Scrape jobs from enabled categories, parsing only cards not seen yet
+        high_water_before = dict(self.high_water)
+        found = self.scraper.scrape_category_records(
+            categories,
+            known_ids=self.seen_jobs,
+            high_water=self.high_water,
+            max_pages=config.get('max_pages', 3),
+            # Reuse listings fetched by /latest, never a category's own previous poll
+            max_age=min(self.scraper.cache_ttl, self.scheduler.min_interval / 2)
+        )
+        started = time.perf_counter()
+        # Only new jobs are copied out of the listing cache, to be enriched and routed
         new_jobs = []
-        
-        for job in jobs:
-            if job['id'] not in self.seen_jobs:
+        for record, slugs in found:
+            if record['id'] not in self.seen_jobs:
+                job = record.to_dict()
+                job['category_slugs'] = slugs
                 new_jobs.append(job)
-                self.seen_jobs.add(job['id'])
-                
-                # Send notification
-                if self.bot:
-                    success = self.bot.notify_new_job(job)
-                    if success:
-                        logger.info(f"Notified: {job['title']}")
-                    else:
-                        logger.error(f"Failed to notify: {job['title']}")
-                else:
-                    logger.info(f"New job (no notifier): {job['title']}")
+        DEDUPE_SECONDS.observe(time.perf_counter() - started)
+        JOBS_SCRAPED.inc(len(found))
+        JOBS_NEW.inc(len(new_jobs))
+        
+        if self.details and new_jobs:
+            enriched = self.scraper.enrich_jobs(
+                new_jobs,
+                self.details,
+                max_workers=config.get('detail_workers', 4),
+                timeout=config.get('detail_timeout_seconds', 10)
+            )
+            logger.info(f"Fetched details of {enriched}/{len(new_jobs)} new jobs")
+        
+        if self.archive is not None and found:
+            archived = {record['id']: record for record, _ in found}
+            archived.update((job['id'], job) for job in new_jobs)
+            self.archive.add(list(archived.values()))
+        
+        # Queue notifications before marking jobs seen, so a crash can at
+        # worst repeat a notification but never lose one
+        if new_jobs and self.ensure_notifier():
+            filters = self.subscriptions.filter_engine()
+            routes = {}
+            for job in new_jobs:
+                # A job listed in several categories goes to the chats of each
+                chat_ids = []
+                for slug in job['category_slugs']:
+                    chat_ids.extend(chat_id for chat_id in subscribers.get(slug, []) if chat_id not in chat_ids)
+                for chat_id in filters.allowed_chats(job, chat_ids):
+                    routes.setdefault(chat_id, []).append(job)
+            self.outbox.add_routes(routes)
+            for job in new_jobs:
+                logger.info(f"Queued: {job['title']}")
+        else:
+            for job in new_jobs:
+                logger.info(f"New job (no notifier): {job['title']}")
         
         # Save updated seen jobs
-        self._save_seen_jobs()
+        self.seen_jobs.add_many(job['id'] for job in new_jobs)
         
-        logger.info(f"Found {len(new_jobs)} new jobs out of {len(jobs)} total")
+        # Feed each category's posting rate into its next poll time
+        now = time.time()
+        for slug in categories:
+            self.scheduler.record(slug, sum(1 for job in new_jobs if slug in job['category_slugs']), now)
+        self._save_seen_jobs(high_water_before)
+        
+        logger.info(f"Found {len(new_jobs)} new jobs out of {len(found)} total")
         return new_jobs
     
-    def run_once(self):
-        """Run a single check"""
+    def run_once(self, categories: Optional[List[str]] = None):
+        """Run a single check (of all subscribed categories by default)"""
         logger.info("Starting job check...")
-        new_jobs = self.check_for_new_jobs()
+        profiler = self.profiler
+        workers = self.scraper.max_workers
+        if profiler:
+            if profiler.sequential:
+                self.scraper.max_workers = 1
+            profiler.before_cycle()
+        started = time.perf_counter()
+        try:
+            new_jobs = self.check_for_new_jobs(categories)
+        finally:
+            self.scraper.max_workers = workers
+            if profiler and profiler.after_cycle():
+                self._finish_profile()
+        CYCLE_SECONDS.observe(time.perf_counter() - started)
+        if self.outbox:
+            OUTBOX_PENDING.set(self.outbox.pending_count())
         logger.info(f"Check complete. {len(new_jobs)} new jobs found.")
         return new_jobs
     
+    def start_profile(self, mode: str = 'cpu', cycles: int = 3, chat_id: Optional[str] = None):
+        """Profile the next cycles of run_once; the summary goes to chat_id (default: owner)"""
+        logger.info(f"Profiling the next {cycles} cycle(s) ({mode})")
+        self.profiler = CycleProfiler(mode, cycles, chat_id)
+    
+    def _finish_profile(self):
+        profiler, self.profiler = self.profiler, None
+        path, summary = profiler.finish()
+        logger.info(summary)
+        if self.bot:
+            self.bot.send_message(
+                f"🔬 <b>Profils gatavs</b>\n<pre>{html.escape(summary)}</pre>",
+                chat_id=profiler.chat_id
+            )
+    
+    def _on_config_change(self, old: Dict, new: Dict):
+        """Apply config changes to the running monitor"""
+        interval = new.get('check_interval_minutes', 10)
+        if interval != old.get('check_interval_minutes', 10):
+            logger.info(f"Check interval changed to {interval} min")
+        
+        self.scheduler.min_interval = new.get('min_check_interval_minutes', 2) * 60
+        self.scheduler.max_interval = interval * 60
+        self.scheduler.requests_per_hour = new.get('max_requests_per_hour', 0)
+        self.scheduler.adaptive = new.get('adaptive_polling', True)
+        self.scheduler.reschedule()
+        
+        self.scraper.cache_ttl = new.get('listing_cache_ttl', 60)
+        
+        if new.get('enabled_categories', []) != old.get('enabled_categories', []):
+            logger.info(f"Categories changed to: {new.get('enabled_categories', [])}")
+    
     def run_continuous(self, interval_minutes: int = 10):
         """Run continuous monitoring with command handling"""
         logger.info(f"Starting continuous monitoring (interval: {interval_minutes} min)")
@@ -707,49 +3760,130 @@ class JobMonitor:
         if self.bot:
             self.bot.send_message("🚀 <b>Bot startēts!</b>\n\nIzmanto /help lai redzētu komandas.")
         
-        last_check = 0
-        check_interval = interval_minutes * 60
-        command_poll_interval = 2  # Check for commands every 2 seconds
+        # Updated by _on_config_change when /interval or config.json changes it
+        self.scheduler.max_interval = interval_minutes * 60
+        self.config_manager.subscribe(self._on_config_change)
+        # Wake up at least this often to notice config.json edits
+        max_wait = 5
         
-        while True:
+        metrics_server = None
+        metrics_port = self.config_manager.get_config().get('metrics_port')
+        if metrics_port:
+            metrics_server = MetricsServer(int(metrics_port))
+            metrics_server.start()
+            logger.info(f"Serving metrics on port {metrics_port} at /metrics")
+        
+        transport = None
+        if self.bot:
+            transport = create_update_transport(self.bot, self.config_manager.get_config())
+            transport.start()
+            # Notifications left over from a previous run go out first
+            self.outbox.start()
+        
+        while not self._stopped.is_set():
             try:
-                # Process any pending Telegram commands
-                if self.bot:
-                    self.bot.process_commands(self.config_manager)
+                # Pick up manual edits of config.json (a cheap stat when unchanged)
+                self.config_manager.reload_if_changed()
+                self.scheduler.sync(list(self.subscriptions.index()))
+                
+                # Wait for a command until the next category poll is due
+                wait = min(max_wait, self.scheduler.next_due() - time.time())
+                if transport:
+                    update = transport.get(timeout=wait)
+                    if update:
+                        self.bot.handle_update(update, self.config_manager)
+                    
+                    request = self.bot.take_profile_request()
+                    if request:
+                        self.start_profile(*request)
                     
                     # Check if user requested immediate check
                     if self.bot.should_force_check():
                         self.run_once()
-                        last_check = time.time()
-                
-                # Check for new jobs at interval
-                current_time = time.time()
-                if current_time - last_check >= check_interval:
-                    self.run_once()
-                    last_check = current_time
+                elif wait > 0:
+                    time.sleep(wait)
                 
-                # Small sleep to avoid hammering CPU/API
-                time.sleep(command_poll_interval)
+                # Check the categories whose poll is due
+                due = self.scheduler.due()
+                if due:
+                    self.run_once(due)
                 
             except KeyboardInterrupt:
-                logger.info("Stopping monitor...")
-                if self.bot:
-                    self.bot.send_message("🛑 Bot apturēts.")
                 break
             except Exception as e:
                 logger.error(f"Error during check: {e}")
-                time.sleep(10)  # Wait a bit before retrying
+                self._stopped.wait(10)  # Wait a bit before retrying
+        
+        logger.info("Stopping monitor...")
+        self._save_poll_rates(force=True)
+        if metrics_server:
+            metrics_server.stop()
+        if transport:
+            transport.stop()
+        if self.bot:
+            self.outbox.stop()
+            self.bot.send_message("🛑 Bot apturēts.")
+    
+    def stop(self):
+        """Make run_continuous return (from another thread) within a few seconds"""
+        self._stopped.set()
 
 
 def main():
     """Main entry point"""
-    monitor = JobMonitor()
-    
     # Check if running in continuous mode
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == '--once':
+        monitor = JobMonitor(one_shot=True)
         monitor.run_once()
+        # Messages a previous run couldn't send go out even without new jobs
+        if monitor.outbox is None and NotificationOutbox.pending_on_disk():
+            monitor.ensure_notifier()
+        if monitor.outbox and not monitor.outbox.drain():
+            logger.warning(f"{monitor.outbox.pending_count()} notifications left for the next run")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--search':
+        # --search <query> [limit]: query the job archive and exit
+        if len(sys.argv) < 3:
+            print("Usage: python scraper.py --search <query> [limit]")
+            return
+        limit = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+        started = time.perf_counter()
+        jobs = JobArchive().search(sys.argv[2], limit)
+        elapsed = time.perf_counter() - started
+        for job in jobs:
+            archived = datetime.fromtimestamp(job['archived_at']).strftime('%Y-%m-%d')
+            print(f"{archived}  {job['title']}")
+            print(f"            {job.get('category', '')} · {job.get('price', '')} · {job.get('location', '')}")
+            print(f"            {job.get('url', '')}")
+        print(f"{len(jobs)} results in {elapsed * 1000:.1f} ms")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--price':
+        # --price <min|-> <max|-> [limit]: archived jobs in a price range, most expensive first
+        if len(sys.argv) < 4:
+            print("Usage: python scraper.py --price <min|-> <max|-> [limit]")
+            return
+        low, high = (None if arg == '-' else float(arg) for arg in sys.argv[2:4])
+        limit = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+        started = time.perf_counter()
+        jobs = JobArchive().price_range(low, high, limit)
+        elapsed = time.perf_counter() - started
+        for job in jobs:
+            print(f"{job['price_value']:>10.2f} {job.get('currency') or ''}  {job['title']}")
+            print(f"                {job.get('category', '')} · {job.get('location', '')} · {job.get('url', '')}")
+        print(f"{len(jobs)} results in {elapsed * 1000:.1f} ms")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--profile':
+        monitor = JobMonitor()
+        # --profile [cpu|memory] [cycles]: profile back-to-back cycles, then exit
+        mode = sys.argv[2] if len(sys.argv) > 2 else 'cpu'
+        cycles = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+        # Back-to-back cycles would otherwise be answered from the listing cache
+        monitor.scraper.cache_ttl = 0
+        monitor.start_profile(mode, cycles)
+        for _ in range(cycles):
+            monitor.run_once()
+        if monitor.outbox and not monitor.outbox.drain():
+            logger.warning(f"{monitor.outbox.pending_count()} notifications left for the next run")
     else:
+        monitor = JobMonitor()
         config = monitor.config_manager.get_config()
         interval = config.get('check_interval_minutes', 10)
         monitor.run_continuous(interval)
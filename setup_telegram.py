@@ -4,46 +4,32 @@ Telegram Bot Setup Helper
 This script helps you set up your Telegram bot for job notifications.
 """
 
-import requests
 import json
 from pathlib import Path
 
+from telegram_api import TelegramApiClient
+
 CONFIG_FILE = Path(__file__).parent / "config.json"
 
 
 def get_bot_info(token: str) -> dict:
     """Get bot information to verify token is correct"""
-    url = f"https://api.telegram.org/bot{token}/getMe"
-    try:
-        response = requests.get(url, timeout=10)
-        return response.json()
-    except Exception as e:
-        return {"ok": False, "description": str(e)}
+    return TelegramApiClient(token).request('getMe', timeout=10, http_method='GET')
 
 
 def get_updates(token: str) -> dict:
     """Get recent updates/messages to the bot"""
-    url = f"https://api.telegram.org/bot{token}/getUpdates"
-    try:
-        response = requests.get(url, timeout=10)
-        return response.json()
-    except Exception as e:
-        return {"ok": False, "description": str(e)}
+    return TelegramApiClient(token).request('getUpdates', timeout=10, http_method='GET')
 
 
 def send_test_message(token: str, chat_id: str) -> dict:
     """Send a test message"""
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {
         'chat_id': chat_id,
         'text': '✅ GetaPro Job Monitor ir veiksmīgi konfigurēts!\n\nJūs saņemsiet paziņojumus par jauniem darba pasūtījumiem.',
         'parse_mode': 'HTML'
     }
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.json()
-    except Exception as e:
-        return {"ok": False, "description": str(e)}
+    return TelegramApiClient(token).request('sendMessage', payload, timeout=10)
 
 
 def update_config(token: str, chat_id: str):
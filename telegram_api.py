@@ -0,0 +1,124 @@
+"""
+Telegram Bot API client
+
+Shared by the job monitor and the setup helper. Every client keeps one
+pooled keep-alive session, so messages after the first skip the TCP+TLS
+handshake with api.telegram.org.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional
+
+API_BASE = "https://api.telegram.org"
+
+
+class TelegramApiError(Exception):
+    """Telegram answered with ok=false"""
+    
+    def __init__(self, description: str, error_code: Optional[int] = None, retry_after: Optional[int] = None):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+
+class TelegramApiClient:
+    """Minimal Bot API client on a pooled requests session"""
+    
+    def __init__(self, token: str, api_url: Optional[str] = None, pool_size: int = 4, retries: int = 3):
+        """
+        Args:
+            token: Bot token from @BotFather
+            api_url: Override of the bot's API URL (e.g. a local stand-in server)
+            pool_size: Keep-alive connections kept open to the API
+            retries: Attempts for connection errors; only idempotent GET
+                requests are retried after the request was sent
+        """
+        self.api_url = api_url or f"{API_BASE}/bot{token}"
+        
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=0,
+            backoff_factor=0.3,
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def call(self, method: str, params: Optional[Dict] = None, timeout: float = 30, http_method: str = 'POST'):
+        """
+        Call a Bot API method and return its result.
+        
+        Raises:
+            TelegramApiError: Telegram rejected the call
+            requests.RequestException: Network failure
+        """
+        url = f"{self.api_url}/{method}"
+        if http_method == 'GET':
+            response = self.session.get(url, params=params, timeout=timeout)
+        else:
+            response = self.session.post(url, json=params, timeout=timeout)
+        
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise TelegramApiError(f"Invalid response from {method}")
+        
+        if not data.get('ok'):
+            parameters = data.get('parameters') or {}
+            raise TelegramApiError(
+                data.get('description', f"HTTP {response.status_code}"),
+                error_code=data.get('error_code', response.status_code),
+                retry_after=parameters.get('retry_after')
+            )
+        
+        return data.get('result')
+    
+    def request(self, method: str, params: Optional[Dict] = None, timeout: float = 30, http_method: str = 'POST') -> Dict:
+        """Like call(), but returns the raw {'ok': ..., ...} dict instead of raising"""
+        try:
+            return {'ok': True, 'result': self.call(method, params, timeout, http_method)}
+        except TelegramApiError as e:
+            return {'ok': False, 'description': e.description, 'error_code': e.error_code}
+        except requests.RequestException as e:
+            return {'ok': False, 'description': str(e)}
+    
+    def get_me(self) -> Dict:
+        return self.call('getMe', http_method='GET')
+    
+    def get_updates(self, offset: Optional[int] = None, timeout: int = 0) -> List[Dict]:
+        params = {'timeout': timeout}
+        if offset is not None:
+            params['offset'] = offset
+        return self.call('getUpdates', params, timeout=timeout + 10, http_method='GET')
+    
+    def send_message(self, chat_id: str, text: str, parse_mode: Optional[str] = "HTML",
+                     disable_web_page_preview: bool = True) -> Dict:
+        payload = {
+            'chat_id': chat_id,
+            'text': text,
+            'disable_web_page_preview': disable_web_page_preview
+        }
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return self.call('sendMessage', payload)
+    
+    def set_webhook(self, url: str, secret_token: str = "", allowed_updates: Optional[List[str]] = None):
+        payload = {'url': url}
+        if secret_token:
+            payload['secret_token'] = secret_token
+        if allowed_updates is not None:
+            payload['allowed_updates'] = allowed_updates
+        return self.call('setWebhook', payload)
+    
+    def delete_webhook(self):
+        return self.call('deleteWebhook')
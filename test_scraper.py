@@ -2,10 +2,47 @@
 Test script to verify the scraper works without sending notifications
 """
 
-from scraper import GetaProScraper
+from scraper import FilterEngine, GetaProScraper, parse_price
 import json
 
 
+def test_parse_price_thousands_separator():
+    """A comma or dot followed by exactly three digits groups thousands"""
+    assert parse_price("1,200 €") == (1200.0, 'EUR')
+    assert parse_price("1.200 €") == (1200.0, 'EUR')
+    assert parse_price("1 200,50 €") == (1200.5, 'EUR')
+    assert parse_price("12,50 €") == (12.5, 'EUR')
+    assert parse_price("50-80 €") == (50.0, 'EUR')
+
+
+
+def test_filter_engine_isolates_regex_filters():
+    """Flags, group names or a broken filter of one chat don't affect the others"""
+    engine = FilterEngine({
+        '1': {'categories': []},
+        '2': {'filters': {'include': ['/(?i)remonts/', '/(?P<w>flīz)/', '/(?P<w>vann)/']}},
+        '3': {'filters': {'include': ['/(a+)+$/']}},
+        '4': {'price_range': {'min': 'daudz'}},
+    })
+    job = {'title': 'Vannas istabas Remonts', 'description': '', 'subcategory': None, 'price_value': 50.0}
+    assert engine.allowed_chats(job, ['1', '2', '3', '4']) == ['1', '2', '3', '4']
+    other = dict(job, title='Logu mazgāšana')
+    assert engine.allowed_chats(other, ['1', '2']) == ['1']
+
+
+def test_late_job_below_high_water_is_new():
+    """A job with a lower ID published after the mark is still reported when known IDs are given"""
+    card = '<div class="job-list-item col" data-id="{0}" data-name="Darbs {0}"></div>'
+    html = ''.join(card.format(job_id) for job_id in (1011, 999, 1009, 1008))
+    scraper = GetaProScraper()
+    
+    jobs, stopped = scraper._parse_new_cards(html, 'Visi', known_ids={'1009', '1008'}, high_water=1009)
+    assert [job['id'] for job in jobs] == ['1011', '999'] and stopped
+    
+    jobs, stopped = scraper._parse_new_cards(html, 'Visi', high_water=1009)
+    assert [job['id'] for job in jobs] == ['1011'] and stopped
+
+
 def main():
     print("=" * 60)
     print("🔍 GetaPro Scraper Test")
@@ -50,6 +87,20 @@ def main():
     else:
         print("⚠️ No IT jobs found")
     
+    # Compare parser backends on the live page
+    print("\n" + "=" * 60)
+    print(f"🧪 Testing: parser parity (active backend: {scraper.parser.name})...")
+    
+    html = scraper.session.get(scraper.JOBS_URL, timeout=30).text
+    differences = scraper.check_parser_parity(html)
+    
+    if differences:
+        print(f"⚠️ Parsers disagree in {len(differences)} places:")
+        for diff in differences[:10]:
+            print(f"   - {diff}")
+    else:
+        print("✅ All parser backends produce identical jobs")
+    
     # Show available categories
     print("\n" + "=" * 60)
     print("📁 Available categories:")